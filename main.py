@@ -8,8 +8,8 @@ map_size = 100
 map_gen = MapGenerator(map_size)
 map_gen.generate_all(num_rivers=15, min_elev_start=0.3, resource_iterations=5)
 
-# Get biome map
-biome_map = map_gen.get_biome_map()
+# Get biome map (compact BiomeGrid; get_biome_map() returns the per-tile Biome object view)
+biome_map = map_gen.get_biome_grid()
 
 # Create the world (no villages yet)
 world = World(map_size, biome_map)
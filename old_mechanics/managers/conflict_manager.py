@@ -12,33 +12,31 @@ class ConflictManager:
     def find_raid_target(self, village):
         """Finds suitable raid targets based on relationship and proximity."""
         candidates = []
-        for other in self.world.villages:
-            if other != village:
-                distance = self.calculate_distance(village.position, other.position)
-                if distance <= RAID_TILE_TARGET_DIST and other.resources["supply"] > 50:
-                    # Get relationship status
-                    relationship = self.world.relationship_manager.get_relationship_status(village.id, other.id)
-                    
-                    # Calculate raid potential based on relationship
+        for other, _ in self.world.spatial_index.within(village.position, RAID_TILE_TARGET_DIST, exclude=village):
+            if other.resources["supply"] > 50:
+                # Get relationship status
+                relationship = self.world.relationship_manager.get_relationship_status(village.id, other.id)
+                
+                # Calculate raid potential based on relationship
+                raid_potential = 0
+                if relationship == "Enemy":
+                    raid_potential = 100
+                elif relationship == "Hostile":
+                    raid_potential = 80
+                elif relationship == "Tense":
+                    raid_potential = 60
+                elif relationship == "Neutral":
+                    raid_potential = 40
+                elif relationship == "Cordial":
+                    raid_potential = 20
+                elif relationship == "Friendly":
+                    raid_potential = 10
+                elif relationship == "Allied":
                     raid_potential = 0
-                    if relationship == "Enemy":
-                        raid_potential = 100
-                    elif relationship == "Hostile":
-                        raid_potential = 80
-                    elif relationship == "Tense":
-                        raid_potential = 60
-                    elif relationship == "Neutral":
-                        raid_potential = 40
-                    elif relationship == "Cordial":
-                        raid_potential = 20
-                    elif relationship == "Friendly":
-                        raid_potential = 10
-                    elif relationship == "Allied":
-                        raid_potential = 0
-                    
-                    # Add to candidates if there's raid potential
-                    if raid_potential > 0:
-                        candidates.append((other, raid_potential))
+                
+                # Add to candidates if there's raid potential
+                if raid_potential > 0:
+                    candidates.append((other, raid_potential))
         
         if candidates:
             # Weight selection by raid potential
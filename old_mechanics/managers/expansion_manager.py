@@ -7,10 +7,11 @@ class ExpansionManager:
     def find_expansion_tile(self):
         """Find the best adjacent tile to expand into."""
         possible_tiles = []
+        rows, cols = self.settlement.biome_map.shape
         for x, y in self.settlement.controlled_tiles:
             neighbors = [(x+1, y), (x-1, y), (x, y+1), (x, y-1)]
             for nx, ny in neighbors:
-                if (nx, ny) not in self.settlement.controlled_tiles and 0 <= nx < len(self.settlement.biome_map) and 0 <= ny < len(self.settlement.biome_map[0]):
+                if (nx, ny) not in self.settlement.controlled_tiles and 0 <= nx < rows and 0 <= ny < cols:
                     biome = self.settlement.biome_map[nx, ny]
                     if biome.name != "Ocean":
                         score = biome.supply * 0.6 + biome.security * 0.2 + biome.satisfaction * 0.2
@@ -1,43 +1,50 @@
 import random
 
 class MigrationManager:
-    def __init__(self, world):
+    def __init__(self, world, target_radius=None):
         self.world = world
+        self.target_radius = target_radius  # Max Manhattan distance to a target; None searches every village
     
+    def candidate_villages(self, village):
+        """Villages migrants may move to: all others, or those within target_radius via the spatial index."""
+        if self.target_radius is None:
+            return [other for other in self.world.villages if other != village]
+        return [other for other, _ in self.world.spatial_index.within(village.position, self.target_radius,
+                                                                      exclude=village)]
+
     def find_migration_target(self, village):
         """Finds suitable migration targets based on relationship and conditions."""
         candidates = []
-        for other in self.world.villages:
-            if other != village:
-                # Get relationship status
-                relationship = self.world.relationship_manager.get_relationship_status(village.id, other.id)
-                
-                # Calculate migration potential based on relationship and conditions
+        for other in self.candidate_villages(village):
+            # Get relationship status
+            relationship = self.world.relationship_manager.get_relationship_status(village.id, other.id)
+            
+            # Calculate migration potential based on relationship and conditions
+            migration_potential = 0
+            
+            # Base potential from relationship
+            if relationship == "Allied":
+                migration_potential = 100
+            elif relationship == "Friendly":
+                migration_potential = 80
+            elif relationship == "Cordial":
+                migration_potential = 60
+            elif relationship == "Neutral":
+                migration_potential = 40
+            elif relationship == "Tense":
+                migration_potential = 20
+            elif relationship == "Hostile":
+                migration_potential = 10
+            elif relationship == "Enemy":
                 migration_potential = 0
+            
+            # Add to candidates if there's migration potential
+            if migration_potential > 0:
+                # Check if target village has good conditions
+                if other.resources["supply"] > 40 and other.resources["satisfaction"] > 50:
+                    migration_potential += 20
                 
-                # Base potential from relationship
-                if relationship == "Allied":
-                    migration_potential = 100
-                elif relationship == "Friendly":
-                    migration_potential = 80
-                elif relationship == "Cordial":
-                    migration_potential = 60
-                elif relationship == "Neutral":
-                    migration_potential = 40
-                elif relationship == "Tense":
-                    migration_potential = 20
-                elif relationship == "Hostile":
-                    migration_potential = 10
-                elif relationship == "Enemy":
-                    migration_potential = 0
-                
-                # Add to candidates if there's migration potential
-                if migration_potential > 0:
-                    # Check if target village has good conditions
-                    if other.resources["supply"] > 40 and other.resources["satisfaction"] > 50:
-                        migration_potential += 20
-                    
-                    candidates.append((other, migration_potential))
+                candidates.append((other, migration_potential))
         
         if candidates:
             # Weight selection by migration potential
@@ -1,6 +1,8 @@
 import random
 import math
 
+MEETING_TILE_DIST = 10  # Villages meet if within 10 tiles
+
 class RelationshipManager:
     def __init__(self, world):
         self.world = world
@@ -224,12 +226,9 @@ class RelationshipManager:
 
     def check_proximity_meetings(self):
         """Checks if villages meet based on proximity."""
-        for village in self.world.villages:
-            for other_village in self.world.villages:
-                if village.id != other_village.id and other_village.id not in self.relationships[village.id]:
-                    distance = abs(village.position[0] - other_village.position[0]) + abs(village.position[1] - other_village.position[1])
-                    if distance <= 10:  # Villages meet if within 10 tiles
-                        self.meet_villages(village, other_village)
+        for village, other_village, _ in self.world.spatial_index.pairs(MEETING_TILE_DIST):
+            if other_village.id not in self.relationships[village.id]:
+                self.meet_villages(village, other_village)
 
     def log_event(self, message):
         """Logs relationship events for debugging."""
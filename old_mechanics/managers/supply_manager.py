@@ -1,5 +1,11 @@
 import random
 
+# (bad-harvest ceiling / normal minimum, normal maximum) per biome; other biomes yield nothing.
+BIOME_HARVEST_YIELD = {
+    "Plains": (4, 10), "Rainforest": (6, 12), "Coast": (4, 10),  # Balanced yields
+    "Tundra": (2, 6), "Desert": (2, 8), "Mountain": (3, 8)
+}
+
 class SupplyManager:
     def __init__(self, settlement):
         self.settlement = settlement
@@ -43,14 +49,10 @@ class SupplyManager:
     def harvest_resources(self):
         """Gather food/resources based on biome type with the possibility of bad harvests."""
         current_biome = self.settlement.biome_map[self.settlement.position[0], self.settlement.position[1]]
-        biome_harvest_yield = {
-            "Plains": (4, 10), "Rainforest": (6, 12), "Coast": (4, 10),  # Balanced yields
-            "Tundra": (2, 6), "Desert": (2, 8), "Mountain": (3, 8)
-        }
 
-        if current_biome.name in biome_harvest_yield:
+        if current_biome.name in BIOME_HARVEST_YIELD:
             if random.random() < 0.2:  # Reduced bad harvest chance to 20%
-                harvested = random.randint(0, biome_harvest_yield[current_biome.name][0])
+                harvested = random.randint(0, BIOME_HARVEST_YIELD[current_biome.name][0])
             else:
-                harvested = random.randint(*biome_harvest_yield[current_biome.name])
+                harvested = random.randint(*BIOME_HARVEST_YIELD[current_biome.name])
             self.settlement.resources["supply"] += harvested
\ No newline at end of file
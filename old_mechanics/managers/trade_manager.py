@@ -13,33 +13,30 @@ class TradeManager:
     def find_trade_partner(self, village):
         """Finds a suitable trade partner based on relationship and proximity."""
         candidates = []
-        for other in self.world.villages:
-            if other != village:
-                distance = self.calculate_distance(village.position, other.position)
-                if distance <= MIN_TILES_FOR_TRADE:
-                    # Get relationship status
-                    relationship = self.world.relationship_manager.get_relationship_status(village.id, other.id)
-                    
-                    # Calculate trade potential based on relationship
-                    trade_potential = 0
-                    if relationship == "Allied":
-                        trade_potential = 100
-                    elif relationship == "Friendly":
-                        trade_potential = 80
-                    elif relationship == "Cordial":
-                        trade_potential = 60
-                    elif relationship == "Neutral":
-                        trade_potential = 40
-                    elif relationship == "Tense":
-                        trade_potential = 20
-                    elif relationship == "Hostile":
-                        trade_potential = 10
-                    elif relationship == "Enemy":
-                        trade_potential = 0
-                    
-                    # Add to candidates if there's trade potential
-                    if trade_potential > 0:
-                        candidates.append((other, trade_potential))
+        for other, _ in self.world.spatial_index.within(village.position, MIN_TILES_FOR_TRADE, exclude=village):
+            # Get relationship status
+            relationship = self.world.relationship_manager.get_relationship_status(village.id, other.id)
+            
+            # Calculate trade potential based on relationship
+            trade_potential = 0
+            if relationship == "Allied":
+                trade_potential = 100
+            elif relationship == "Friendly":
+                trade_potential = 80
+            elif relationship == "Cordial":
+                trade_potential = 60
+            elif relationship == "Neutral":
+                trade_potential = 40
+            elif relationship == "Tense":
+                trade_potential = 20
+            elif relationship == "Hostile":
+                trade_potential = 10
+            elif relationship == "Enemy":
+                trade_potential = 0
+            
+            # Add to candidates if there's trade potential
+            if trade_potential > 0:
+                candidates.append((other, trade_potential))
         
         if candidates:
             # Weight selection by trade potential
@@ -0,0 +1,429 @@
+import uuid
+
+import numpy as np
+
+from managers.supply_manager import BIOME_HARVEST_YIELD
+from settlement import CHANCE_OF_MIGRATION
+from world_gen.biomes import BIOME_NAMES, as_biome_grid, biome_data
+
+TIERS = ("Hamlet", "Village", "Town", "City-State")
+RESOURCE_COLUMNS = ("supply", "storage", "security", "satisfaction")
+
+# Per-biome-id lookup tables: ExpansionManager's tile score (NaN for Ocean, which is never
+# claimed) and the BIOME_HARVEST_YIELD range (0, 0 for biomes without a harvest).
+EXPANSION_SCORE = np.array([np.nan if name == "Ocean" else
+                            biome_data[name]["supply"] * 0.6 + biome_data[name]["security"] * 0.2
+                            + biome_data[name]["satisfaction"] * 0.2 for name in BIOME_NAMES])
+HARVEST_YIELD = np.array([BIOME_HARVEST_YIELD.get(name, (0, 0)) for name in BIOME_NAMES], dtype=np.int64)
+CAN_HARVEST = np.array([name in BIOME_HARVEST_YIELD for name in BIOME_NAMES])
+
+# (chance, message, column, impact from the column's values) in the order Settlement.trigger_disaster checks them.
+DISASTERS = (
+    (0.15, "Famine! Supply reduced", "supply", lambda supply: -np.maximum(30, np.trunc(supply * 0.3))),
+    (0.08, "Plague! Population -15%", "population", lambda population: -(population * 15 // 100)),
+    (0.10, "Raiders attack! Security -20", "security", lambda security: -20),
+    (0.12, "Fire! Storage -30", "storage", lambda storage: -30),
+)
+
+class ResourceView:
+    """Dict-like window onto the resource columns of one table row, so `resources["supply"] += x` still works."""
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, name):
+        if name not in RESOURCE_COLUMNS:
+            raise KeyError(name)
+        return float(getattr(self.table, name)[self.index])
+
+    def __setitem__(self, name, value):
+        if name not in RESOURCE_COLUMNS:
+            raise KeyError(name)
+        getattr(self.table, name)[self.index] = value
+
+    def __iter__(self):
+        return iter(RESOURCE_COLUMNS)
+
+    def keys(self):
+        return RESOURCE_COLUMNS
+
+    def items(self):
+        return [(name, self[name]) for name in RESOURCE_COLUMNS]
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+class SettlementRow:
+    """
+    Lightweight view of one SettlementTable row with the attributes of a Village.
+
+    Trade, conflict, migration and relationship managers can use it in place of a
+    Village: reads and writes go straight to the table's columns.
+    """
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+        self.resources = ResourceView(table, index)
+
+    @property
+    def id(self):
+        return self.table.ids[self.index]
+
+    @property
+    def position(self):
+        return (int(self.table.row[self.index]), int(self.table.col[self.index]))
+
+    @property
+    def controlled_tiles(self):
+        return self.table.controlled_tiles[self.index]
+
+    @property
+    def biome_map(self):
+        return self.table.biome_map
+
+    @property
+    def met_settlements(self):
+        return self.table.met_settlements[self.index]
+
+    @property
+    def population(self):
+        return int(self.table.population[self.index])
+
+    @population.setter
+    def population(self, value):
+        self.table.population[self.index] = value
+
+    @property
+    def tier(self):
+        return TIERS[self.table.tier[self.index]]
+
+    @tier.setter
+    def tier(self, value):
+        self.table.tier[self.index] = TIERS.index(value)
+
+    @property
+    def is_active(self):
+        return bool(self.table.active[self.index])
+
+    @is_active.setter
+    def is_active(self, value):
+        self.table.active[self.index] = value
+
+    @property
+    def collapse_reason(self):
+        return self.table.collapse_reason[self.index]
+
+    @collapse_reason.setter
+    def collapse_reason(self, value):
+        self.table.collapse_reason[self.index] = value
+
+    def __eq__(self, other):
+        return isinstance(other, SettlementRow) and other.table is self.table and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.table), self.index))
+
+    def __repr__(self):
+        return f"SettlementRow({self.index}, {self.tier} at {self.position}, population={self.population})"
+
+class SettlementTable:
+    """
+    Structure-of-arrays store for many settlements with a vectorized turn.
+
+    Population, the four resources, tier, active flag, position and territory size are
+    NumPy columns, so every per-turn rule of SupplyManager, SecurityManager,
+    SatisfactionManager, Settlement.update_population, trigger_disaster and
+    trigger_migration runs as masked array operations over all settlements at once.
+    Rows are never removed; collapsed settlements stay with active=False. Territories
+    stay Python sets per row; grow them through expand(), which keeps each row's
+    frontier of candidate tiles in sync.
+
+    The rules match the object versions, but draws come from one NumPy generator, so
+    a table run is not step-for-step identical to a run of Village objects. Promotion
+    and disaster messages are not printed.
+
+    Parameters:
+        biome_map (BiomeGrid or np.array): The world's BiomeGrid (a 2D array of Biome
+            objects is packed into one first). Tile scores and harvest yields are looked
+            up by biome id.
+        seed (int, np.random.Generator or None): Random source for the turn rules.
+    """
+
+    def __init__(self, biome_map, seed=None):
+        self.biome_map = as_biome_grid(biome_map)
+        self.rng = np.random.default_rng(seed)
+        self.size = 0
+        self.population = np.zeros(0, dtype=np.int64)
+        self.supply = np.zeros(0)
+        self.storage = np.zeros(0)
+        self.security = np.zeros(0)
+        self.satisfaction = np.zeros(0)
+        self.tier = np.zeros(0, dtype=np.int8)  # Index into TIERS.
+        self.active = np.zeros(0, dtype=bool)
+        self.row = np.zeros(0, dtype=np.int32)
+        self.col = np.zeros(0, dtype=np.int32)
+        self.tile_count = np.zeros(0, dtype=np.int32)  # len(controlled_tiles), kept in sync by expand().
+        self.harvest_low = np.zeros(0, dtype=np.int64)  # BIOME_HARVEST_YIELD of the home tile.
+        self.harvest_high = np.zeros(0, dtype=np.int64)
+        self.can_harvest = np.zeros(0, dtype=bool)
+        self.ids = []
+        self.controlled_tiles = []
+        self.met_settlements = []
+        self.collapse_reason = []
+        self.frontiers = []  # Candidate expansion tiles per row, None until first needed.
+        self.expansion_score = EXPANSION_SCORE[self.biome_map.ids]  # Score per tile, NaN where not claimable.
+
+    _COLUMNS = ("population", "supply", "storage", "security", "satisfaction", "tier", "active", "row", "col",
+                "tile_count", "harvest_low", "harvest_high", "can_harvest")
+
+    def add(self, start_x, start_y, population=50, resources=None, tier="Hamlet", settlement_id=None):
+        """Founds a settlement at (start_x, start_y) with Settlement's defaults and returns its row view."""
+        index = self.size
+        if index == self.population.size:  # Double the capacity of every column.
+            for name in self._COLUMNS:
+                column = getattr(self, name)
+                setattr(self, name, np.concatenate([column, np.zeros(max(column.size, 16), dtype=column.dtype)]))
+        self.size += 1
+
+        resources = resources or {}
+        self.population[index] = population
+        for name in RESOURCE_COLUMNS:
+            getattr(self, name)[index] = resources.get(name, 50)
+        self.tier[index] = TIERS.index(tier)
+        self.active[index] = True
+        self.row[index], self.col[index] = start_x, start_y
+        self.tile_count[index] = 1
+        biome_id = self.biome_map.ids[start_x, start_y]
+        self.can_harvest[index] = CAN_HARVEST[biome_id]
+        self.harvest_low[index], self.harvest_high[index] = HARVEST_YIELD[biome_id]
+        self.ids.append(settlement_id or uuid.uuid4())
+        self.controlled_tiles.append({(start_x, start_y)})
+        self.met_settlements.append([])
+        self.collapse_reason.append(None)
+        self.frontiers.append(None)
+        return SettlementRow(self, index)
+
+    @classmethod
+    def from_settlements(cls, settlements, biome_map, seed=None):
+        """Copies Settlement/Village objects into a new table (ids, territories and tiers included)."""
+        table = cls(biome_map, seed)
+        for settlement in settlements:
+            row = table.add(*settlement.position, population=settlement.population,
+                            resources=settlement.resources, tier=settlement.tier, settlement_id=settlement.id)
+            row.controlled_tiles.update(settlement.controlled_tiles)
+            table.tile_count[row.index] = len(row.controlled_tiles)
+            table.active[row.index] = settlement.is_active
+            table.collapse_reason[row.index] = settlement.collapse_reason
+        return table
+
+    def __len__(self):
+        return self.size
+
+    def view(self, index):
+        return SettlementRow(self, index)
+
+    def active_rows(self):
+        """Row views of every active settlement."""
+        return [SettlementRow(self, index) for index in np.flatnonzero(self.active[:self.size])]
+
+    def _columns(self):
+        """The live (first size entries) slices of the numeric columns, as a dict."""
+        return {name: getattr(self, name)[:self.size] for name in self._COLUMNS}
+
+    def _randint(self, low, high):
+        """random.randint(low, high) per row (inclusive bounds, scalars or arrays)."""
+        return self.rng.integers(low, np.asarray(high) + 1, size=self.size)
+
+    def _efficiency(self, c):
+        return np.maximum(0.5, 1 - c["population"] / 500)
+
+    def store_resources(self):
+        """SupplyManager.store_resources: excess supply above 60 moves into storage."""
+        c = self._columns()
+        mask = c["active"] & (c["supply"] > 60)
+        stored = np.minimum(c["supply"] - 60, 15 * self._efficiency(c))
+        c["supply"][mask] -= stored[mask]
+        c["storage"][mask] += stored[mask]
+
+    def use_storage(self):
+        """SupplyManager.use_storage: supply below 15 is refilled from storage."""
+        c = self._columns()
+        mask = c["active"] & (c["supply"] < 15) & (c["storage"] > 0)
+        retrieved = np.minimum(c["storage"], 25 * self._efficiency(c))
+        c["supply"][mask] += retrieved[mask]
+        c["storage"][mask] -= retrieved[mask]
+
+    def harvest_resources(self):
+        """SupplyManager.harvest_resources: a yield from the home biome, poor one time in five."""
+        c = self._columns()
+        bad = self.rng.random(self.size) < 0.2
+        harvested = np.where(bad, self._randint(0, c["harvest_low"]),
+                             self._randint(c["harvest_low"], c["harvest_high"]))
+        mask = c["active"] & c["can_harvest"]
+        c["supply"][mask] += harvested[mask]
+
+    def consume_resources(self):
+        """SupplyManager.consume_resources: consumption grows faster than population."""
+        c = self._columns()
+        density_factor = 1 + (c["population"] / 200) ** 1.5
+        consumption = 1.5 * density_factor * (c["population"] / 50) * self.rng.uniform(0.9, 1.1, self.size)
+        c["supply"][c["active"]] -= consumption[c["active"]]
+
+    def _drift(self, large_population, small_population):
+        """Shared random +3/-3 drift and population bonus/penalty of security and satisfaction."""
+        c = self._columns()
+        change = np.where(self.rng.random(self.size) < 0.25, 3, 0) - np.where(self.rng.random(self.size) < 0.2, 3, 0)
+        change -= c["population"] > large_population
+        change += c["population"] < small_population
+        return c, change
+
+    def manage_security(self):
+        """SecurityManager.manage_security."""
+        c, change = self._drift(300, 100)
+        change -= c["tile_count"] > 5
+        change += c["tile_count"] < 3
+        c["security"][c["active"]] += change[c["active"]]
+
+    def manage_satisfaction(self):
+        """SatisfactionManager.manage_satisfaction."""
+        c, change = self._drift(200, 50)
+        change += c["supply"] > 80
+        change -= 2 * (c["supply"] < 20)
+        c["satisfaction"][c["active"]] += change[c["active"]]
+
+    def _frontier(self, index):
+        """Tiles an expansion of row index may claim; built on first use and updated as the territory grows."""
+        frontier = self.frontiers[index]
+        if frontier is None:
+            frontier = self.frontiers[index] = set()
+            for tile in self.controlled_tiles[index]:
+                self._extend_frontier(index, frontier, tile)
+        return frontier
+
+    def _extend_frontier(self, index, frontier, tile):
+        rows, cols = self.biome_map.shape
+        x, y = tile
+        for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if 0 <= nx < rows and 0 <= ny < cols and not np.isnan(self.expansion_score[nx, ny]) \
+                    and (nx, ny) not in self.controlled_tiles[index]:
+                frontier.add((nx, ny))
+
+    def expand(self):
+        """
+        ExpansionManager.expand: the eligibility test is vectorized; eligible settlements
+        claim the best-scoring tile of their frontier, a per-settlement set of candidate
+        tiles kept up to date instead of rescanning the whole territory every turn.
+        """
+        c = self._columns()
+        eligible = c["active"] & (c["population"] >= 15) & (c["supply"] > 40) & (self.rng.random(self.size) < 0.6)
+        cost = self._randint(3, 8)
+        scores = self.expansion_score
+        for index in np.flatnonzero(eligible):
+            frontier = self._frontier(index)
+            if frontier:
+                new_tile = max(frontier, key=scores.__getitem__)
+                frontier.discard(new_tile)
+                self.controlled_tiles[index].add(new_tile)
+                self._extend_frontier(index, frontier, new_tile)
+                c["tile_count"][index] += 1
+                c["population"][index] -= cost[index]
+
+    def evolve_settlements(self):
+        """Settlement.evolve_settlement: at most one promotion per settlement and turn."""
+        c = self._columns()
+        promote = c["active"] & (
+            ((c["tier"] == 0) & (c["population"] >= 80) & (c["tile_count"] >= 3) & (c["security"] >= 40))
+            | ((c["tier"] == 1) & (c["population"] >= 400) & (c["satisfaction"] >= 50))
+            | ((c["tier"] == 2) & (c["population"] >= 800) & (c["tile_count"] >= 8) & (c["security"] >= 70)))
+        c["tier"][promote] += 1
+
+    def update_population(self):
+        """Settlement.update_population: starvation below zero supply, otherwise logistic growth."""
+        c = self._columns()
+        population = c["population"]
+        starving = c["active"] & (c["supply"] <= 0)
+        starvation_loss = np.trunc(self._randint(5, 15) * (np.maximum(population, 0) / 200) ** 1.2)
+        satisfaction_loss = self._randint(10, 20)
+
+        carrying_capacity = np.minimum(c["tile_count"] * 50, c["supply"] * 2)
+        fed = c["active"] & ~starving
+        growing = fed & (population < carrying_capacity)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            growth_factor = (carrying_capacity - population) / carrying_capacity
+        growth = np.trunc(self._randint(1, 3) * growth_factor)
+        growth = np.trunc(growth * np.maximum(0.3, 1 - population / 500))
+        grows = growing & (self.rng.random(self.size) < 0.85)
+        declines = fed & ~growing & (self.rng.random(self.size) < 0.3)
+        decline = self._randint(1, 3)
+
+        population[starving] -= starvation_loss[starving].astype(np.int64)
+        c["satisfaction"][starving] -= satisfaction_loss[starving]
+        population[grows] += growth[grows].astype(np.int64)
+        population[declines] -= decline[declines]
+        c["satisfaction"][declines] -= 1
+        self._set_reason(starving & (population <= 0), "Starvation")
+
+    def trigger_disasters(self):
+        """Settlement.trigger_disaster: the first disaster (in DISASTERS order) whose chance the draw is under."""
+        c = self._columns()
+        draw = self.rng.random(self.size)
+        struck = ~c["active"]
+        for chance, message, column, impact in DISASTERS:
+            hit = ~struck & (draw < chance)
+            if hit.any():
+                values = c[column]
+                values[hit] = np.maximum(0, values[hit] + impact(values[hit]))
+                self._set_reason(hit & (c["population"] <= 0), message)
+            struck |= hit
+
+    def trigger_migrations(self):
+        """
+        Settlement.trigger_migration: unhappy or hungry settlements lose 10-25 people.
+
+        Returns:
+            list: (row index, migrants) of the groups that found a new village; founding it
+                is left to the caller, as with the ("new_village", migrants) signal.
+        """
+        c = self._columns()
+        migrating = c["active"] & ((c["satisfaction"] < 30) | (c["supply"] < 20))
+        migrants = self._randint(10, 25)
+        c["population"][migrating] = np.maximum(0, c["population"][migrating] - migrants[migrating])
+        self._set_reason(migrating & (c["population"] <= 0), "Mass Migration")
+        founders = migrating & (self.rng.random(self.size) < CHANCE_OF_MIGRATION)
+        return [(int(index), int(migrants[index])) for index in np.flatnonzero(founders)]
+
+    def _set_reason(self, mask, reason):
+        for index in np.flatnonzero(mask):
+            self.collapse_reason[index] = reason
+
+    def tick(self, consumption=True, disasters=True, migration=True):
+        """
+        Advances every active settlement one turn.
+
+        Runs Village.update's steps (storage transfer, harvest, security and satisfaction
+        drift, expansion, promotion, population) plus consumption, disasters and
+        migration, then marks settlements whose population reached zero as collapsed.
+
+        Returns:
+            tuple: (indices of the rows that collapsed this turn, trigger_migrations output).
+        """
+        self.store_resources()
+        self.use_storage()
+        self.harvest_resources()
+        if consumption:
+            self.consume_resources()
+        self.manage_security()
+        self.manage_satisfaction()
+        self.expand()
+        self.evolve_settlements()
+        self.update_population()
+        if disasters:
+            self.trigger_disasters()
+        founders = self.trigger_migrations() if migration else []
+
+        c = self._columns()
+        collapsed = np.flatnonzero(c["active"] & (c["population"] <= 0))
+        c["active"][collapsed] = False
+        return collapsed, founders
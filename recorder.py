@@ -0,0 +1,245 @@
+# recorder.py
+import os
+import subprocess
+
+import numpy as np
+
+from visualization import WORLD_BIOME_PALETTE, new_figure, render_biomes
+
+# Opacity of the territory overlay.
+TERRITORY_ALPHA = 115
+
+class FrameDirectoryWriter:
+    """Writes every frame as <directory>/frame_<n>.png."""
+
+    def __init__(self, directory, fps=None):
+        self.directory = directory
+        self.frames = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, frame):
+        from PIL import Image
+        Image.fromarray(frame).save(os.path.join(self.directory, f"frame_{self.frames:05d}.png"))
+        self.frames += 1
+
+    def close(self):
+        pass
+
+class GifWriter:
+    """
+    Collects frames as paletted images and writes the GIF on close.
+
+    GIFs cannot be appended to, so every frame stays in memory (one byte per pixel);
+    use a video or a frame directory for very long runs.
+    """
+
+    def __init__(self, path, fps=10):
+        self.path = path
+        self.duration = 1000 / fps
+        self.images = []
+
+    def write(self, frame):
+        from PIL import Image
+        self.images.append(Image.fromarray(frame).quantize(256))
+
+    def close(self):
+        if self.images:
+            self.images[0].save(self.path, save_all=True, append_images=self.images[1:], duration=self.duration,
+                                loop=0)
+        self.images = []
+
+class FFMpegWriter:
+    """Streams raw RGB frames into an ffmpeg process (matplotlib's animation.ffmpeg_path)."""
+
+    def __init__(self, path, fps=10):
+        self.path = path
+        self.fps = fps
+        self.process = None
+
+    def write(self, frame):
+        if self.process is None:
+            import matplotlib
+            height, width = frame.shape[:2]
+            command = [matplotlib.rcParams["animation.ffmpeg_path"], "-y", "-loglevel", "error",
+                       "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(self.fps),
+                       "-i", "pipe:", "-pix_fmt", "yuv420p", "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", self.path]
+            self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        self.process.stdin.write(np.ascontiguousarray(frame).tobytes())
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            if self.process.wait():
+                raise RuntimeError(f"ffmpeg failed writing {self.path}")
+            self.process = None
+
+def frame_writer(output, fps=10):
+    """Writer for output by extension: .gif -> GifWriter, other extensions -> FFMpegWriter, none -> frame directory."""
+    extension = os.path.splitext(output)[1].lower()
+    if not extension:
+        return FrameDirectoryWriter(output)
+    if extension == ".gif":
+        return GifWriter(output, fps)
+    return FFMpegWriter(output, fps)
+
+def _position(entry):
+    """(row, col) of a settlement or of a bare position tuple."""
+    return getattr(entry, "position", entry)
+
+class WorldRecorder:
+    """
+    Records a World turn by turn as animation frames.
+
+    The biome map and axes are drawn once and kept as a background bitmap. Each
+    capture only restores that bitmap and redraws the overlays with updated data:
+    the territory layer (an RGBA image where only tiles that changed owner are
+    repainted), one scatter for active settlements, one for collapsed ones, one line
+    collection for the trade routes of the turn and the turn label. Frames go to a
+    writer as they are captured, so memory does not grow with the number of turns
+    (except for GIFs, see GifWriter).
+
+    Parameters:
+        world (World): Simulation to record (map_size, biome_map, villages,
+            collapsed_villages, and trade_manager.trade_log if present).
+        output (str or None): Video path (.mp4 etc., needs ffmpeg), .gif path, or a
+            directory for PNG frames; None records nothing (e.g. with live=True).
+        fps (int): Frame rate of the video or GIF.
+        figsize (tuple): Figure size in inches.
+        dpi (int): Figure resolution.
+        live (bool): Also show the animation in a pyplot window, blitting each frame.
+    """
+
+    def __init__(self, world, output, fps=10, figsize=(10, 10), dpi=100, live=False):
+        from matplotlib.collections import LineCollection
+
+        self.world = world
+        self.live = live
+        self.writer = frame_writer(output, fps) if output is not None else None
+        self.frames = 0
+        self._painted = {}  # Settlement id -> (owner key, tiles painted so far).
+        self._next_key = 0
+        self._trades_seen = 0
+
+        size = world.map_size
+        self.owner = np.full((size, size), -1, dtype=np.int32)  # Owner key of every painted tile.
+        self.territory = np.zeros((size, size, 4), dtype=np.uint8)
+
+        self.fig = new_figure(None if live else output, figsize=figsize, dpi=dpi)
+        ax = self.ax = self.fig.add_subplot()
+        ax.imshow(render_biomes(world.biome_map, WORLD_BIOME_PALETTE), origin="upper")
+        ax.set_xlabel("X Coordinate")
+        ax.set_ylabel("Y Coordinate")
+        ax.set_autoscale_on(False)
+
+        self.territory_image = ax.imshow(self.territory, origin="upper", animated=True)
+        self.routes = ax.add_collection(LineCollection([], colors="gold", linewidths=1.5, animated=True))
+        self.settlements = ax.scatter([], [], c="black", edgecolors="white", s=20, zorder=3, animated=True)
+        self.collapsed = ax.scatter([], [], c="red", marker="x", s=25, zorder=3, animated=True)
+        self.label = ax.text(0.01, 0.99, "", transform=ax.transAxes, ha="left", va="top", color="white",
+                             weight="bold", animated=True)
+        self.overlays = (self.territory_image, self.routes, self.settlements, self.collapsed, self.label)
+
+        self.fig.tight_layout()
+        self.fig.canvas.draw()  # Animated artists are left out of this draw.
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _territory_color(self, key):
+        from matplotlib import colormaps
+        color = colormaps["tab20"](key % 20)
+        return [round(c * 255) for c in color[:3]] + [TERRITORY_ALPHA]
+
+    def _update_territories(self, villages):
+        """Repaints only the tiles settlements gained or lost, and those of settlements that appeared or disappeared."""
+        changed = False
+        active = {village.id: village for village in villages if getattr(village, "is_active", True)}
+        cleared = set()
+        for settlement_id in [sid for sid in self._painted if sid not in active]:
+            key, tiles = self._painted.pop(settlement_id)
+            mask = self.owner == key
+            self.owner[mask] = -1
+            self.territory[mask] = 0
+            cleared.update(tiles)
+            changed = True
+        for settlement_id, village in active.items():
+            if settlement_id not in self._painted:
+                self._painted[settlement_id] = (self._next_key, set())
+                self._next_key += 1
+            key, painted = self._painted[settlement_id]
+            tiles = set(village.controlled_tiles)
+            added, removed = tiles - painted, painted - tiles
+            if removed:  # Only clear tiles still shown in this settlement's colour.
+                rows, cols = np.array(list(removed)).T
+                mine = self.owner[rows, cols] == key
+                self.owner[rows[mine], cols[mine]] = -1
+                self.territory[rows[mine], cols[mine]] = 0
+                cleared.update(removed)
+                changed = True
+            if added:
+                rows, cols = np.array(list(added)).T
+                self.owner[rows, cols] = key
+                self.territory[rows, cols] = self._territory_color(key)
+                changed = True
+            painted.clear()
+            painted.update(tiles)
+        if cleared:  # Hand cleared tiles that other settlements also hold back to them.
+            for key, painted in self._painted.values():
+                shared = [tile for tile in painted & cleared if self.owner[tile] == -1]
+                if shared:
+                    rows, cols = np.array(shared).T
+                    self.owner[rows, cols] = key
+                    self.territory[rows, cols] = self._territory_color(key)
+        if changed:
+            self.territory_image.set_data(self.territory)
+
+    def _trade_log(self, trade_log):
+        if trade_log is None:
+            trade_log = getattr(getattr(self.world, "trade_manager", None), "trade_log", ())
+        new = trade_log[self._trades_seen:]
+        self._trades_seen = len(trade_log)
+        return new
+
+    def capture(self, turn, trade_log=None):
+        """
+        Renders the world's current state as the next frame.
+
+        Parameters:
+            turn (int): Turn number shown on the frame.
+            trade_log (list or None): The world's append-only trade log of
+                (from position, to position, success) entries; trades added since the
+                previous capture are drawn. None reads world.trade_manager.trade_log.
+        """
+        villages = self.world.villages
+        self._update_territories(villages)
+
+        positions = np.array([_position(v) for v in villages if getattr(v, "is_active", True)]).reshape(-1, 2)
+        self.settlements.set_offsets(positions[:, ::-1])
+        populations = np.array([v.population for v in villages if getattr(v, "is_active", True)], dtype=float)
+        self.settlements.set_sizes(10 + np.sqrt(np.maximum(populations, 0)))
+        collapsed = np.array([_position(v) for v in self.world.collapsed_villages]).reshape(-1, 2)
+        self.collapsed.set_offsets(collapsed[:, ::-1])
+        self.routes.set_segments([[_position(a)[::-1], _position(b)[::-1]]
+                                  for a, b, *_ in self._trade_log(trade_log)])
+        self.label.set_text(f"Turn {turn}")
+
+        canvas = self.fig.canvas
+        canvas.restore_region(self.background)
+        for artist in self.overlays:
+            self.ax.draw_artist(artist)
+        if self.live:
+            canvas.blit(self.fig.bbox)
+            canvas.flush_events()
+        if self.writer is not None:
+            self.writer.write(np.asarray(canvas.buffer_rgba())[..., :3])
+        self.frames += 1
+
+    def close(self):
+        """Finishes the video/GIF; safe to call more than once."""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
@@ -0,0 +1,123 @@
+# spatial_index.py
+from collections import defaultdict
+
+# Bucket side in tiles: the largest interaction radius (meetings at 10 tiles; trade and raids at 8).
+CELL_SIZE = 10
+
+class SpatialIndex:
+    """
+    Uniform bucket grid over settlement positions for Manhattan radius queries.
+
+    Each settlement sits in the bucket of side cell_size containing its position, so a
+    query within radius r only looks at the (2 * ceil(r / cell_size) + 1)^2 buckets
+    around the centre instead of every settlement; with cell_size at the interaction
+    radius that is 3 x 3 buckets.
+
+    The settlement list stays the source of truth. The index is updated incrementally
+    (add() when a settlement is founded, update() after it moved, remove() when it
+    collapses) and sync() reconciles it with the list in one O(V) pass, which World
+    runs at the start of every turn so settlements appended to world.villages directly
+    are picked up. Queries skip settlements that are no longer active and measure
+    distances from their current position, so collapses and moves within a turn never
+    produce stale answers; a settlement that moved since it was last indexed is only
+    found from around its old bucket until the next update() or sync().
+
+    Parameters:
+        cell_size (int): Bucket side length in tiles.
+    """
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.buckets = defaultdict(dict)  # (cell row, cell col) -> {settlement id: settlement}.
+        self.cells = {}  # Settlement id -> (position, cell) it is indexed under.
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, settlement):
+        return settlement.id in self.cells
+
+    def _cell(self, position):
+        return (position[0] // self.cell_size, position[1] // self.cell_size)
+
+    def add(self, settlement):
+        """Indexes a settlement at its current position (re-indexes it if already present)."""
+        if settlement.id in self.cells:
+            self.remove(settlement)
+        cell = self._cell(settlement.position)
+        self.buckets[cell][settlement.id] = settlement
+        self.cells[settlement.id] = (settlement.position, cell)
+
+    def remove(self, settlement):
+        """Drops a settlement from the index; unknown settlements are ignored."""
+        self._discard(settlement.id)
+
+    def _discard(self, settlement_id):
+        entry = self.cells.pop(settlement_id, None)
+        if entry is not None:
+            bucket = self.buckets[entry[1]]
+            del bucket[settlement_id]
+            if not bucket:
+                del self.buckets[entry[1]]
+
+    def update(self, settlement):
+        """Moves a settlement to the bucket of its new position; a no-op if it did not move."""
+        entry = self.cells.get(settlement.id)
+        if entry is None or entry[0] != settlement.position:
+            self.add(settlement)
+
+    def sync(self, settlements):
+        """
+        Reconciles the index with a settlement list: indexes new and moved active
+        settlements and drops those that collapsed or are no longer listed.
+        """
+        listed = set()
+        for settlement in settlements:
+            if getattr(settlement, "is_active", True):
+                listed.add(settlement.id)
+                self.update(settlement)
+        for settlement_id in [sid for sid in self.cells if sid not in listed]:
+            self._discard(settlement_id)
+
+    def within(self, position, radius, exclude=None):
+        """
+        Settlements within Manhattan distance radius of position.
+
+        Parameters:
+            position (tuple): (row, col) centre of the query.
+            radius (int): Maximum Manhattan distance, inclusive.
+            exclude (object or None): Settlement to leave out, typically the one asking.
+
+        Returns:
+            list: (settlement, distance) pairs, in no particular order.
+        """
+        x, y = position
+        reach = -(-radius // self.cell_size)
+        cx, cy = self._cell(position)
+        exclude_id = getattr(exclude, "id", None)
+        found = []
+        for i in range(cx - reach, cx + reach + 1):
+            for j in range(cy - reach, cy + reach + 1):
+                bucket = self.buckets.get((i, j))
+                if not bucket:
+                    continue
+                for settlement_id, settlement in bucket.items():
+                    if settlement_id == exclude_id or not getattr(settlement, "is_active", True):
+                        continue
+                    other = settlement.position
+                    distance = abs(x - other[0]) + abs(y - other[1])
+                    if distance <= radius:
+                        found.append((settlement, distance))
+        return found
+
+    def pairs(self, radius):
+        """Every unordered pair of active settlements within Manhattan distance radius, as (a, b, distance)."""
+        seen = set()
+        for settlement_id, (_, cell) in self.cells.items():
+            seen.add(settlement_id)
+            settlement = self.buckets[cell][settlement_id]
+            if not getattr(settlement, "is_active", True):
+                continue
+            for other, distance in self.within(settlement.position, radius, exclude=settlement):
+                if other.id not in seen:
+                    yield settlement, other, distance
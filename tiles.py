@@ -0,0 +1,288 @@
+# tiles.py
+from collections import OrderedDict
+
+import numpy as np
+
+from world_gen.biomes import BIOME_NAMES, FEATURE_NAMES, as_biome_grid, decode_mask
+from visualization import BIOME_COLORS, BIOME_PALETTE, new_figure, save_figure
+
+# Side length in pixels of a rendered tile.
+TILE_SIZE = 256
+
+# Colour painted over river cells.
+RIVER_RGB = (0, 0, 255)
+
+def _pad_to(array, factor, fill):
+    """Pads the first two axes of array up to multiples of factor with fill."""
+    rows, cols = array.shape[:2]
+    pad = ((0, -rows % factor), (0, -cols % factor)) + ((0, 0),) * (array.ndim - 2)
+    return np.pad(array, pad, constant_values=fill) if any(after for _, after in pad[:2]) else array
+
+def _quads(array, fill):
+    """The four strided views (top left, top right, ...) of the 2x2 blocks of a padded array."""
+    array = _pad_to(array, 2, fill)
+    return array[0::2, 0::2], array[0::2, 1::2], array[1::2, 0::2], array[1::2, 1::2]
+
+def count_pool(ids, n_values):
+    """
+    Occurrences of every value in each 2x2 block of an id grid.
+
+    Returns:
+        list: One (rows / 2, cols / 2) uint8 count grid per value; ids >= n_values
+            (padding) are not counted.
+    """
+    quads = [np.ascontiguousarray(quad) for quad in _quads(ids, n_values)]
+    equal = np.empty(quads[0].shape, dtype=bool)
+    counts = []
+    for value in range(n_values):
+        count = np.zeros(quads[0].shape, dtype=np.uint8)
+        for quad in quads:
+            np.equal(quad, value, out=equal)
+            count += equal.view(np.uint8)
+        counts.append(count)
+    return counts
+
+def sum_pool(counts):
+    """Adds each value's counts over 2x2 blocks of cells, widening the dtype as needed."""
+    dtype = np.min_scalar_type(4 * max(int(count.max(initial=0)) for count in counts))
+    pooled = []
+    for count in counts:
+        top_left, top_right, bottom_left, bottom_right = _quads(count, 0)
+        total = top_left.astype(dtype)
+        total += top_right
+        total += bottom_left
+        total += bottom_right
+        pooled.append(total)
+    return pooled
+
+def mode(counts, dtype=np.uint8):
+    """Index of the largest of the count grids per cell (the lowest index on ties)."""
+    best = counts[0].copy()
+    ids = np.zeros(best.shape, dtype=dtype)
+    for value, count in enumerate(counts[1:], start=1):
+        larger = count > best
+        ids[larger] = value
+        np.maximum(best, count, out=best)
+    return ids
+
+def max_pool(mask):
+    """Whether any cell of each 2x2 block is set."""
+    top_left, top_right, bottom_left, bottom_right = _quads(mask, False)
+    return top_left | top_right | bottom_left | bottom_right
+
+def or_pool(bits, factor=2):
+    """Bitwise OR over each factor x factor block of a bitmask grid."""
+    if factor == 2:
+        top_left, top_right, bottom_left, bottom_right = _quads(bits, 0)
+        return top_left | top_right | bottom_left | bottom_right
+    bits = _pad_to(bits, factor, 0)
+    rows, cols = bits.shape
+    blocks = bits.reshape(rows // factor, factor, cols // factor, factor)
+    return np.bitwise_or.reduce(np.bitwise_or.reduce(blocks, axis=3), axis=1)
+
+class TilePyramid:
+    """
+    Downsampled image pyramid of a biome map, rendered on demand in fixed-size tiles.
+
+    Level k holds one cell per 2**k x 2**k block of map tiles: the most common biome of
+    the block (mode pooling, computed from per-biome counts that are summed level by
+    level, so every level is exact), whether any tile of the block is river (max
+    pooling) and the union of its special features (OR pooling). Levels are added
+    until the whole map fits in one tile. Only tiles that are asked for are rendered,
+    and the most recent max_tiles of them stay cached.
+
+    Parameters:
+        biome_map (BiomeGrid or np.array): Biome grid or 2D array of Biome objects.
+        river_map (np.array or None): 2D boolean array indicating river locations.
+        palette (np.array): Biome palette (see visualization.biome_palette).
+        tile_size (int): Side length of a tile in cells.
+        max_tiles (int): Number of rendered tiles kept in the LRU cache.
+    """
+
+    def __init__(self, biome_map, river_map=None, palette=BIOME_PALETTE, tile_size=TILE_SIZE, max_tiles=256):
+        biome_grid = as_biome_grid(biome_map)
+        self.palette = palette
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.shape = biome_grid.shape
+        self._tiles = OrderedDict()
+
+        ids = np.asarray(biome_grid.ids)
+        rivers = np.zeros(self.shape, dtype=bool) if river_map is None else np.asarray(river_map, dtype=bool)
+        features = np.asarray(biome_grid.special_features)
+        self.ids = [ids]  # Biome id per cell, per level.
+        self.rivers = [rivers]  # River flag per cell, per level.
+        self.features = [features]  # Feature bitmask per cell, per level.
+
+        counts = None
+        while max(self.ids[-1].shape) > tile_size:
+            counts = count_pool(ids, len(BIOME_NAMES)) if counts is None else sum_pool(counts)
+            self.ids.append(mode(counts, ids.dtype))
+            self.rivers.append(max_pool(self.rivers[-1]))
+            self.features.append(or_pool(self.features[-1]))
+
+    @property
+    def levels(self):
+        return len(self.ids)
+
+    def level_for(self, tiles_per_pixel):
+        """The coarsest level whose cells are no larger than tiles_per_pixel map tiles."""
+        level = int(np.floor(np.log2(max(tiles_per_pixel, 1))))
+        return min(level, self.levels - 1)
+
+    def tile(self, level, ti, tj):
+        """RGB uint8 image of tile (ti, tj) of a level (edge tiles are cropped to the level)."""
+        key = (level, ti, tj)
+        image = self._tiles.get(key)
+        if image is not None:
+            self._tiles.move_to_end(key)
+            return image
+
+        size = self.tile_size
+        window = (slice(ti * size, (ti + 1) * size), slice(tj * size, (tj + 1) * size))
+        image = self.palette.take(self.ids[level][window], axis=0, mode="clip")
+        image[self.rivers[level][window]] = RIVER_RGB
+        self._tiles[key] = image
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+        return image
+
+    def _cells(self, level, row0, row1, col0, col1):
+        """Level cells covering map tiles [row0, row1) x [col0, col1), clipped to the map."""
+        scale = 2 ** level
+        rows, cols = self.ids[level].shape
+        r0, c0 = min(max(row0 // scale, 0), rows - 1), min(max(col0 // scale, 0), cols - 1)
+        r1, c1 = min(-(-row1 // scale), rows), min(-(-col1 // scale), cols)
+        return r0, max(r1, r0 + 1), c0, max(c1, c0 + 1)
+
+    def view(self, level, row0, row1, col0, col1):
+        """
+        Assembles the visible part of a level from its tiles.
+
+        Returns:
+            tuple: (RGB uint8 image, imshow extent in map coordinates).
+        """
+        r0, r1, c0, c1 = self._cells(level, row0, row1, col0, col1)
+        size = self.tile_size
+        image = np.empty((r1 - r0, c1 - c0, 3), dtype=np.uint8)
+        for ti in range(r0 // size, (r1 - 1) // size + 1):
+            for tj in range(c0 // size, (c1 - 1) // size + 1):
+                tile = self.tile(level, ti, tj)
+                tr0, tc0 = ti * size, tj * size
+                rs, re = max(r0, tr0), min(r1, tr0 + tile.shape[0])
+                cs, ce = max(c0, tc0), min(c1, tc0 + tile.shape[1])
+                image[rs - r0:re - r0, cs - c0:ce - c0] = tile[rs - tr0:re - tr0, cs - tc0:ce - tc0]
+        scale = 2 ** level
+        extent = (c0 * scale - 0.5, c1 * scale - 0.5, r1 * scale - 0.5, r0 * scale - 0.5)
+        return image, extent
+
+    def glyphs(self, level, row0, row1, col0, col1, max_glyphs=200):
+        """
+        Feature labels for the visible part of a level, at most max_glyphs of them.
+
+        Cells are merged into power-of-two blocks until the visible area holds at most
+        max_glyphs blocks; each block with features gets one label (the initials of the
+        union of its features) at its centre.
+
+        Returns:
+            list: (row, col, label) in map coordinates.
+        """
+        r0, r1, c0, c1 = self._cells(level, row0, row1, col0, col1)
+        block = 1
+        while -(-(r1 - r0) // block) * -(-(c1 - c0) // block) > max_glyphs:
+            block *= 2
+        r0, c0 = r0 - r0 % block, c0 - c0 % block  # Align blocks so they don't shift while panning.
+        merged = or_pool(self.features[level][r0:r1, c0:c1], block)
+        scale = 2 ** level * block
+        glyphs = []
+        for i, j in zip(*np.nonzero(merged)):
+            label = ",".join(feature[0] for feature in decode_mask(merged[i, j], FEATURE_NAMES))
+            glyphs.append((float(r0 * 2 ** level + (i + 0.5) * scale - 0.5),
+                           float(c0 * 2 ** level + (j + 0.5) * scale - 0.5), label))
+        return glyphs
+
+class TileViewer:
+    """
+    Shows a TilePyramid on matplotlib axes and re-renders it whenever they pan or zoom.
+
+    The axes hold a single image, replaced with the tiles of the level matching the
+    current zoom and viewport, and at most max_glyphs feature labels.
+    """
+
+    def __init__(self, pyramid, ax, max_glyphs=200):
+        self.pyramid = pyramid
+        self.ax = ax
+        self.max_glyphs = max_glyphs
+        self.level = None
+        self._texts = []
+        rows, cols = pyramid.shape
+        self.image = ax.imshow(np.zeros((1, 1, 3), dtype=np.uint8), origin="upper", interpolation="nearest")
+        ax.set_autoscale_on(False)
+        ax.set_xlim(-0.5, cols - 0.5)
+        ax.set_ylim(rows - 0.5, -0.5)
+        ax.callbacks.connect("xlim_changed", self._on_limits)
+        ax.callbacks.connect("ylim_changed", self._on_limits)
+        self.update()
+
+    def _on_limits(self, ax):
+        self.update()
+
+    def update(self):
+        """Renders the current viewport of the axes."""
+        x0, x1 = sorted(self.ax.get_xlim())
+        y0, y1 = sorted(self.ax.get_ylim())
+        row0, row1 = int(np.floor(y0 + 0.5)), int(np.ceil(y1 + 0.5))
+        col0, col1 = int(np.floor(x0 + 0.5)), int(np.ceil(x1 + 0.5))
+        # The drawn box shrinks to keep the aspect, so measure the space it may take instead.
+        box = self.ax.get_position(original=True)
+        width = max(box.width * self.ax.figure.bbox.width, 1)
+        height = max(box.height * self.ax.figure.bbox.height, 1)
+        self.level = self.pyramid.level_for(max((x1 - x0) / width, (y1 - y0) / height))
+
+        image, extent = self.pyramid.view(self.level, row0, row1, col0, col1)
+        self.image.set_data(image)
+        self.image.set_extent(extent)
+
+        for text in self._texts:
+            text.remove()
+        self._texts = [self.ax.text(col, row, label, color="white", fontsize=9, ha="center", va="center",
+                                    weight="bold", clip_on=True)
+                       for row, col, label in self.pyramid.glyphs(self.level, row0, row1, col0, col1,
+                                                                  self.max_glyphs)]
+        self.ax.figure.canvas.draw_idle()
+
+def plot_tiled_map(biome_map, river_map, viewport=None, path=None, format=None, max_glyphs=200):
+    """
+    Zoomable biome map for large worlds, drawn from a TilePyramid.
+
+    Parameters:
+        biome_map (BiomeGrid or np.array): Biome grid or 2D array of Biome objects.
+        river_map (np.array): 2D boolean array indicating river locations.
+        viewport (tuple or None): (row0, row1, col0, col1) to start at; the whole map if None.
+        path (str, file-like or None): Render that viewport headless to this file instead
+            of showing an interactive figure (see visualization.save_figure for format).
+        max_glyphs (int): Maximum number of feature labels on screen.
+
+    Returns:
+        TileViewer: The viewer (its figure is viewer.ax.figure).
+    """
+    fig = new_figure(path, figsize=(12, 12))
+    ax = fig.add_subplot()
+    viewer = TileViewer(TilePyramid(biome_map, river_map), ax, max_glyphs)
+    if viewport is not None:
+        row0, row1, col0, col1 = viewport
+        ax.set_xlim(col0 - 0.5, col1 - 0.5)
+        ax.set_ylim(row1 - 0.5, row0 - 0.5)
+    ax.set_title("Biome Map", fontsize=16)
+    from matplotlib.patches import Patch
+    patches = [Patch(color=color, label=biome) for biome, color in BIOME_COLORS.items()]
+    ax.legend(handles=patches, bbox_to_anchor=(1.05, 1), loc="upper left")
+    fig.tight_layout()
+    viewer.update()  # The layout changed the axes size, and so possibly the level.
+
+    if path is None:
+        import matplotlib.pyplot as plt
+        plt.show()
+    else:
+        save_figure(fig, path, format)
+    return viewer
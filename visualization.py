@@ -1,273 +1,454 @@
-import matplotlib.pyplot as plt
+import os
+
 import numpy as np
-import networkx as nx
-import matplotlib.patches as mpatches
 
-def plot_livestock_map(biome_map):
+from world_gen.biomes import BIOME_NAMES, FEATURE_NAMES, LIVESTOCK_NAMES, RESOURCE_IDS, as_biome_grid, decode_mask
+from world_gen.chunks import map_chunks
+
+# matplotlib is imported inside the functions that draw, so importing this module (and
+# world.py) stays cheap. Plots given a path render on a bare Agg canvas and never
+# import pyplot or a GUI backend.
+
+# Biome colours of the map plots; "Unknown" also colours ids outside BIOME_NAMES.
+BIOME_COLORS = {
+    "Ocean": "#1f77b4", "Coast": "#2ca02c", "Plains": "#bcbd22",
+    "Rainforest": "#17becf", "Desert": "#e377c2", "Tundra": "#7f7f7f",
+    "Mountain": "#8c564b", "Unknown": "#d62728"
+}
+
+# Biome colours of the simulation world map.
+WORLD_BIOME_COLORS = {
+    "Ocean": (0.1, 0.4, 0.8),        # Deep blue
+    "Plains": (0.6, 0.8, 0.4),       # Light green
+    "Rainforest": (0.0, 0.5, 0.0),   # Dark green
+    "Coast": (0.7, 0.9, 0.6),        # Sandy/green coast
+    "Tundra": (0.8, 0.8, 0.8),       # Light gray
+    "Desert": (0.9, 0.8, 0.5),       # Pale yellow
+    "Mountain": (0.5, 0.5, 0.5),     # Gray
+    "Unknown": (1.0, 0.0, 0.0)       # Red fallback
+}
+
+# Light gray behind the livestock and resource markers.
+BACKGROUND_RGB = (178, 178, 178)
+
+# Marker colours of the livestock and resource overlays.
+LIVESTOCK_COLORS = {
+    "Camel": "brown",
+    "Reindeer": "white",
+    "Yak": "gray",
+    "Elephant": "purple",
+    "Cattle": "red",
+    "Horse": "darkred",
+    "Sheep": "lightgray",
+    "Pig": "pink",
+    "Mountain Goat": "darkgreen",
+    "Seal": "navy",
+    "Fish": "blue",
+    "Dolphin": "aqua",
+    "Whale": "teal"
+}
+
+RESOURCE_COLORS = {
+    "Salt": "gray", "Copper": "orange",
+    "Fur": "brown", "Iron": "darkgray",
+    "Rubber": "black", "Herbs": "green",
+    "Wheat": "yellow",
+    "Gold": "gold", "Coal": "black",
+    "Pearls": "pink", "Coral": "cyan"
+}
+
+def _rgb8(color):
+    """A "#rrggbb" string or (r, g, b) floats in [0, 1] as a uint8 triple."""
+    if isinstance(color, str):
+        return tuple(int(color[k:k + 2], 16) for k in (1, 3, 5))
+    return tuple(round(c * 255) for c in color)
+
+def biome_palette(colors):
+    """
+    Lookup table from biome id to colour.
+
+    Returns:
+        np.array: (len(BIOME_NAMES) + 1, 3) uint8 array, one row per biome id followed by
+            colors["Unknown"], which also stands in for biomes missing from colors.
+    """
+    return np.array([_rgb8(colors.get(name, colors["Unknown"])) for name in BIOME_NAMES + ("Unknown",)],
+                    dtype=np.uint8)
+
+BIOME_PALETTE = biome_palette(BIOME_COLORS)
+WORLD_BIOME_PALETTE = biome_palette(WORLD_BIOME_COLORS)
+
+def render_biomes(biome_map, palette=BIOME_PALETTE):
+    """
+    Renders a biome grid as an RGB image with a single palette lookup.
+
+    Parameters:
+        biome_map (BiomeGrid or np.array): Biome grid or 2D array of Biome objects.
+        palette (np.array): biome_palette output; ids past its end get its last row.
+
+    Returns:
+        np.array: (rows, cols, 3) uint8 image.
+    """
+    ids = np.asarray(as_biome_grid(biome_map).ids)
+    return palette.take(ids, axis=0, mode="clip")
+
+def livestock_points(biome_map):
+    """{animal: (rows, cols)} of the tiles holding each animal, read from the livestock bitmasks."""
+    livestock = np.asarray(as_biome_grid(biome_map).livestock)
+    return {animal: np.nonzero(livestock & (1 << bit)) for bit, animal in enumerate(LIVESTOCK_NAMES)}
+
+def resource_points(resource_map):
+    """
+    {resource: (rows, cols)} of the tiles holding each resource.
+
+    Parameters:
+        resource_map (np.array or dict): Resource-id grid, or dictionary mapping (i, j) to resource names.
+    """
+    if isinstance(resource_map, dict):
+        tiles = {}
+        for (i, j), resource in resource_map.items():
+            tiles.setdefault(resource, []).append((i, j))
+        return {resource: tuple(np.array(coords).T) for resource, coords in tiles.items()}
+    resource_map = np.asarray(resource_map)
+    return {resource: np.nonzero(resource_map == resource_id) for resource, resource_id in RESOURCE_IDS.items()}
+
+def scatter_overlay(ax, points, colors, size, alpha, marker="o", rasterized=False):
+    """
+    Draws one scatter collection per category instead of one artist per marker.
+
+    Parameters:
+        ax (matplotlib.axes.Axes): Axes to draw on.
+        points (dict): {category: (rows, cols)}, e.g. from livestock_points.
+        colors (dict): {category: colour}; categories missing here are not drawn.
+        size, alpha, marker: Marker style passed to ax.scatter.
+        rasterized (bool): Store the markers as a bitmap in vector output (PDF/SVG).
+
+    Returns:
+        dict: {category: PathCollection} of the categories present.
+    """
+    collections = {}
+    for category, color in colors.items():
+        rows, cols = points.get(category, ((), ()))
+        if len(rows):
+            collections[category] = ax.scatter(cols, rows, color=color, s=size, alpha=alpha, marker=marker,
+                                                rasterized=rasterized)
+    return collections
+
+def paint_overlay(image, points, colors):
+    """
+    Colours the pixel of every point in place, for maps too large for markers.
+
+    Categories are painted in the order of colors, so later ones win on shared tiles.
+    """
+    from matplotlib.colors import to_rgb
+    for category, color in colors.items():
+        rows, cols = points.get(category, ((), ()))
+        image[rows, cols] = _rgb8(to_rgb(color))
+    return image
+
+def new_figure(path=None, **kwargs):
+    """
+    A pyplot figure when path is None, otherwise a pyplot-free figure on an Agg canvas.
+
+    kwargs are passed to the figure (figsize, dpi, ...).
+    """
+    if path is None:
+        import matplotlib.pyplot as plt
+        return plt.figure(**kwargs)
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
+def save_figure(fig, target, format=None):
+    """
+    Renders fig with Agg into target, a file path or a writable binary buffer.
+
+    Parameters:
+        fig (matplotlib.figure.Figure): Figure to render.
+        target (str or file-like): Destination.
+        format (str or None): Any savefig format (e.g. "png"), or "rgb" for raw row-major
+            uint8 RGB pixels. None infers it from the path suffix (".rgb" is raw),
+            defaulting to PNG.
+
+    Returns:
+        tuple or None: (height, width) of the raw image for "rgb", otherwise None.
+    """
+    if format is None and isinstance(target, (str, os.PathLike)) and os.fspath(target).endswith(".rgb"):
+        format = "rgb"
+    if format != "rgb":
+        fig.savefig(target, format=format)
+        return None
+
+    fig.canvas.draw()
+    image = np.asarray(fig.canvas.buffer_rgba())[..., :3]
+    data = np.ascontiguousarray(image).tobytes()
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "wb") as f:
+            f.write(data)
+    else:
+        target.write(data)
+    return image.shape[:2]
+
+def _show_or_save(fig, path, format):
+    """Shows a pyplot figure, or renders a headless one to path."""
+    if path is None:
+        import matplotlib.pyplot as plt
+        plt.show()
+    else:
+        save_figure(fig, path, format)
+    return fig
+
+def _legend_patches(colors):
+    from matplotlib.patches import Patch
+    return [Patch(color=color, label=name) for name, color in colors.items()]
+
+def _legend_markers(colors, markersize=8):
+    from matplotlib.lines import Line2D
+    return [Line2D([0], [0], marker='o', color='w', markersize=markersize, markerfacecolor=color, label=name)
+            for name, color in colors.items()]
+
+def _render(plot, args, kwargs):
+    plot(*args, **kwargs)
+    return kwargs["path"]
+
+def render_many(jobs, workers=None):
+    """
+    Renders plots to files concurrently in a process pool.
+
+    Parameters:
+        jobs (iterable): (plot function, args, kwargs) triples, e.g.
+            (plot_world_map, (size, grid, [], [], []), {"path": "turn_0001.png"}).
+            kwargs must include a path, so every plot renders headless.
+        workers (int or None): Pool size; None uses every core, 1 renders in this process.
+
+    Returns:
+        list: The paths written, in job order.
+    """
+    return list(map_chunks(_render, jobs, workers or os.cpu_count()))
+
+def plot_livestock_map(biome_map, raster=False, path=None, format=None):
     """
     Visualizes livestock distribution using colored dots directly from biome objects.
 
     Parameters:
-        biome_map (np.array): 2D array of Biome objects.
+        biome_map (BiomeGrid or np.array): Biome grid or 2D array of Biome objects.
+        raster (bool): Colour the tiles in the image instead of drawing markers (for large maps).
+        path (str, file-like or None): Render headless to this file instead of showing
+            (see save_figure for format).
     """
-    map_size = biome_map.shape[0]
+    biome_grid = as_biome_grid(biome_map)
+    map_size = biome_grid.shape[0]
+    points = livestock_points(biome_grid)  # Decode livestock from the biome grid
 
-    # Define colors for different livestock.
-    livestock_colors = {
-        "Camel": "brown",
-        "Reindeer": "white",
-        "Yak": "gray",
-        "Elephant": "purple",
-        "Cattle": "red",
-        "Horse": "darkred",
-        "Sheep": "lightgray",
-        "Pig": "pink",
-        "Mountain Goat": "darkgreen",
-        "Seal": "navy",
-        "Fish": "blue",
-        "Dolphin": "aqua",
-        "Whale": "teal"
-    }
-
-    plt.figure(figsize=(12, 12))
+    fig = new_figure(path, figsize=(12, 12))
+    ax = fig.add_subplot()
 
     # Background Biome Map (Grayscale for Clarity)
-    biome_color_map = np.zeros((map_size, map_size, 3))
-    for i in range(map_size):
-        for j in range(map_size):
-            biome_color_map[i, j] = (0.7, 0.7, 0.7)  # Light gray background
+    biome_color_map = np.full((map_size, map_size, 3), BACKGROUND_RGB, dtype=np.uint8)
+    if raster:
+        paint_overlay(biome_color_map, points, LIVESTOCK_COLORS)
 
-    plt.imshow(biome_color_map, origin="upper")
+    ax.imshow(biome_color_map, origin="upper")
 
-    # Overlay livestock dots (directly from biome objects)
-    for i in range(map_size):
-        for j in range(map_size):
-            animals = biome_map[i, j].livestock  # Get livestock from biome object
-            for animal in animals:
-                if animal in livestock_colors:
-                    plt.scatter(j, i, color=livestock_colors[animal], s=15, alpha=0.8)
+    # Overlay livestock dots
+    if not raster:
+        scatter_overlay(ax, points, LIVESTOCK_COLORS, size=15, alpha=0.8)
 
-    plt.title("Livestock Map", fontsize=16)
-    plt.axis("off")
+    ax.set_title("Livestock Map", fontsize=16)
+    ax.axis("off")
 
     # Legend for livestock colors
-    handles = [plt.Line2D([0], [0], marker='o', color='w', markersize=8, markerfacecolor=color, label=animal)
-               for animal, color in livestock_colors.items()]
-    plt.legend(handles=handles, bbox_to_anchor=(1.05, 1), loc="upper left")
+    ax.legend(handles=_legend_markers(LIVESTOCK_COLORS), bbox_to_anchor=(1.05, 1), loc="upper left")
 
-    plt.show()
+    return _show_or_save(fig, path, format)
 
 
-def plot_enlarged_biome_map(biome_map, river_map):
+def plot_enlarged_biome_map(biome_map, river_map, path=None, format=None):
     """
     Displays an enlarged biome map with special feature annotations.
     
     Parameters:
-        biome_map (np.array): 2D array of Biome objects.
+        biome_map (BiomeGrid or np.array): Biome grid or 2D array of Biome objects.
         river_map (np.array): 2D boolean array indicating river locations.
+        path (str, file-like or None): Render headless to this file instead of showing
+            (see save_figure for format).
     """
-    # Define colors for each biome.
-    biome_colors = {
-        "Ocean": "#1f77b4", 
-        "Coast": "#2ca02c", 
-        "Plains": "#bcbd22",
-        "Rainforest": "#17becf", 
-        "Desert": "#e377c2", 
-        "Tundra": "#7f7f7f",
-        "Mountain": "#8c564b", 
-        "Unknown": "#d62728"
-    }
-    
-    map_size = biome_map.shape[0]
+    biome_grid = as_biome_grid(biome_map)
+
     # Build a color map for visualization.
-    biome_color_map = np.zeros((map_size, map_size, 3))
-    for i in range(map_size):
-        for j in range(map_size):
-            biome_name = biome_map[i, j].name if biome_map[i, j] else "Unknown"
-            color_hex = biome_colors.get(biome_name, "#d62728")
-            # Convert hex to RGB tuple (normalized to 0-1).
-            biome_color_map[i, j] = tuple(int(color_hex[k:k+2], 16) / 255 for k in (1, 3, 5))
+    biome_color_map = render_biomes(biome_grid)
     
     # Create a larger figure for better visibility.
-    plt.figure(figsize=(12, 12))
-    plt.imshow(biome_color_map, origin="upper")
-    plt.title("Enlarged Biome Map", fontsize=16)
+    fig = new_figure(path, figsize=(12, 12))
+    ax = fig.add_subplot()
+    ax.imshow(biome_color_map, origin="upper")
+    ax.set_title("Enlarged Biome Map", fontsize=16)
     
     # Overlay rivers in blue.
     river_i, river_j = np.where(river_map)
-    plt.scatter(river_j, river_i, c="blue", s=20, alpha=0.7)
+    ax.scatter(river_j, river_i, c="blue", s=20, alpha=0.7)
     
-    # Add text annotations for special features.
-    # For clarity, we use a larger font size.
-    for i in range(map_size):
-        for j in range(map_size):
-            features = biome_map[i, j].special_features if biome_map[i, j] else []
-            if features:
-                # Create a label with the first letter of each feature.
-                label = ",".join([f[0] for f in features])
-                plt.text(j, i, label, color="white", fontsize=12, ha="center", va="center", weight="bold")
+    # Label special features with the first letter of each feature: one text-marker
+    # scatter per distinct feature combination instead of one text artist per tile.
+    features = np.asarray(biome_grid.special_features)
+    for mask in np.unique(features[features != 0]):
+        rows, cols = np.nonzero(features == mask)
+        label = ",".join(feature[0] for feature in decode_mask(mask, FEATURE_NAMES))
+        # Text markers are scaled to fit the marker size; 12pt bold is ~7.5pt per character.
+        ax.scatter(cols, rows, marker=f"$\\mathbf{{{label}}}$", s=(7.5 * len(label)) ** 2, c="white",
+                   linewidths=0)
     
     # Build custom legend for biomes.
-    patches = [mpatches.Patch(color=color, label=biome) for biome, color in biome_colors.items()]
-    plt.legend(handles=patches, bbox_to_anchor=(1.05, 1), loc="upper left")
+    ax.legend(handles=_legend_patches(BIOME_COLORS), bbox_to_anchor=(1.05, 1), loc="upper left")
     
-    plt.axis("off")
-    plt.tight_layout()
-    plt.show()
+    ax.axis("off")
+    fig.tight_layout()
+    return _show_or_save(fig, path, format)
 
 
-def plot_maps(elevation_map, temperature_map, moisture_map, biome_map, river_map):
-    """Visualizes multiple maps side-by-side with biome special feature annotations."""
-    
-    fig, ax = plt.subplots(1, 4, figsize=(24, 5))
+def plot_maps(elevation_map, temperature_map, moisture_map, biome_map, river_map, stride=1, fig=None, path=None,
+              format=None):
+    """
+    Visualizes multiple maps side-by-side with biome special feature annotations.
+
+    stride is the tile spacing of the maps (e.g. a MapGenerator.preview level), so axes
+    stay in map coordinates at every resolution. Passing fig redraws that figure in
+    place and returns without blocking, which is how plot_preview shows each level as
+    it arrives; otherwise a new figure is shown, or rendered headless to path (see
+    save_figure for format).
+    """
+    refresh = fig is not None
+    if refresh:
+        fig.clf()
+    else:
+        fig = new_figure(path, figsize=(24, 5))
+    ax = fig.subplots(1, 4)
+    rows, cols = np.shape(elevation_map)
+    extent = (-0.5, cols * stride - 0.5, rows * stride - 0.5, -0.5)
 
     # Elevation Map
-    elev_plot = ax[0].imshow(elevation_map, cmap="terrain", origin="upper")
+    elev_plot = ax[0].imshow(elevation_map, cmap="terrain", origin="upper", extent=extent)
     ax[0].set_title("Elevation Map")
-    plt.colorbar(elev_plot, ax=ax[0])
+    fig.colorbar(elev_plot, ax=ax[0])
 
     # Temperature Map (Converted to Celsius)
     temp_celsius = temperature_map * 40 - 10  # Convert to -10°C to 30°C
-    temp_plot = ax[1].imshow(temp_celsius, cmap="coolwarm", origin="upper")
+    temp_plot = ax[1].imshow(temp_celsius, cmap="coolwarm", origin="upper", extent=extent)
     ax[1].set_title("Temperature Map (°C)")
-    plt.colorbar(temp_plot, ax=ax[1])
+    fig.colorbar(temp_plot, ax=ax[1])
 
     # Moisture Map
-    moist_plot = ax[2].imshow(moisture_map, cmap="Blues", origin="upper")
+    moist_plot = ax[2].imshow(moisture_map, cmap="Blues", origin="upper", extent=extent)
     ax[2].set_title("Moisture Map")
-    plt.colorbar(moist_plot, ax=ax[2])
+    fig.colorbar(moist_plot, ax=ax[2])
 
     # Biome Map with Custom Colors
-    biome_colors = {
-        "Ocean": "#1f77b4", "Coast": "#2ca02c", "Plains": "#bcbd22",
-        "Rainforest": "#17becf", "Desert": "#e377c2", "Tundra": "#7f7f7f",
-        "Mountain": "#8c564b", "Unknown": "#d62728"
-    }
-    
-    biome_color_map = np.zeros((biome_map.shape[0], biome_map.shape[1], 3))
-    for i in range(biome_map.shape[0]):
-        for j in range(biome_map.shape[1]):
-            # Use the biome name stored in the object
-            biome_name = biome_map[i, j].name if biome_map[i, j] else "Unknown"
-            color_hex = biome_colors.get(biome_name, "#d62728")
-            biome_color_map[i, j] = tuple(int(color_hex[k:k+2], 16) / 255 for k in (1, 3, 5))
-
-    ax[3].imshow(biome_color_map, origin="upper")
-    ax[3].set_title("Biome Map")
+    biome_color_map = render_biomes(biome_map)
+    ax[3].imshow(biome_color_map, origin="upper", extent=extent)
+    ax[3].set_title("Biome Map" if stride == 1 else f"Biome Map (1/{stride} preview)")
 
     # Overlay Rivers on Biome Map
     river_i, river_j = np.where(river_map)
-    ax[3].scatter(river_j, river_i, c="blue", s=5, alpha=0.7)  # Blue dots for rivers
+    ax[3].scatter(river_j * stride, river_i * stride, c="blue", s=5, alpha=0.7)  # Blue dots for rivers
     
     # Build custom legend for biomes
-    patches = [mpatches.Patch(color=color, label=biome) for biome, color in biome_colors.items()]
-    ax[3].legend(handles=patches, bbox_to_anchor=(1.05, 1), loc="upper left")
+    ax[3].legend(handles=_legend_patches(BIOME_COLORS), bbox_to_anchor=(1.05, 1), loc="upper left")
+
+    fig.tight_layout()
+    if refresh:
+        import matplotlib.pyplot as plt
+        fig.canvas.draw_idle()
+        plt.pause(0.001)
+        return fig
+    return _show_or_save(fig, path, format)
 
-    plt.tight_layout()
+def plot_preview(levels):
+    """
+    Shows MapGenerator.preview levels as they arrive, refining one figure in place.
+
+    Parameters:
+        levels (iterable): PreviewLevel tuples, coarsest first.
+    """
+    import matplotlib.pyplot as plt
+    fig = plt.figure(figsize=(24, 5))
+    for level in levels:
+        plot_maps(level.elevation, level.temperature, level.moisture, level.biome_grid, level.river_map,
+                  stride=level.stride, fig=fig)
     plt.show()
 
-def plot_resource_map(biome_map, resource_map):
+def plot_resource_map(biome_map, resource_map, raster=False, path=None, format=None):
     """
     Visualizes the resource distribution using colored markers on the biome map.
 
     Parameters:
-        biome_map (np.array): 2D array of Biome objects.
-        resource_map (dict): Dictionary mapping (i, j) to resource names.
+        biome_map (BiomeGrid or np.array): Biome grid or 2D array of Biome objects.
+        resource_map (np.array or dict): Resource-id grid, or dictionary mapping (i, j) to resource names.
+        raster (bool): Colour the tiles in the image instead of drawing markers (for large maps).
+        path (str, file-like or None): Render headless to this file instead of showing
+            (see save_figure for format).
     """
     map_size = biome_map.shape[0]
+    points = resource_points(resource_map)
 
-    # Assign colors to resources
-    resource_colors = {
-        "Salt": "gray", "Copper": "orange",
-        "Fur": "brown", "Iron": "darkgray",
-        "Rubber": "black", "Herbs": "green",
-        "Wheat": "yellow", 
-        "Gold": "gold", "Coal": "black",
-        "Pearls": "pink", "Coral": "cyan"
-    }
-
-    plt.figure(figsize=(12, 12))
+    fig = new_figure(path, figsize=(12, 12))
+    ax = fig.add_subplot()
     
     # Background Biome Map (Grayscale for clarity)
-    biome_color_map = np.zeros((map_size, map_size, 3))
-    for i in range(map_size):
-        for j in range(map_size):
-            biome_color_map[i, j] = (0.7, 0.7, 0.7)  # Light gray background
+    biome_color_map = np.full((map_size, map_size, 3), BACKGROUND_RGB, dtype=np.uint8)
+    if raster:
+        paint_overlay(biome_color_map, points, RESOURCE_COLORS)
 
-    plt.imshow(biome_color_map, origin="upper")
+    ax.imshow(biome_color_map, origin="upper")
 
     # Overlay resources using colored dots
-    for (i, j), resource in resource_map.items():
-        if resource in resource_colors:
-            plt.scatter(j, i, color=resource_colors[resource], s=20, alpha=0.8)
+    if not raster:
+        scatter_overlay(ax, points, RESOURCE_COLORS, size=20, alpha=0.8)
 
-    plt.title("Resource Map with Cellular Automata", fontsize=16)
-    plt.axis("off")
+    ax.set_title("Resource Map with Cellular Automata", fontsize=16)
+    ax.axis("off")
 
     # Legend for resource colors
-    handles = [plt.Line2D([0], [0], marker='o', color='w', markersize=8, markerfacecolor=color, label=resource)
-               for resource, color in resource_colors.items()]
-    plt.legend(handles=handles, bbox_to_anchor=(1.05, 1), loc="upper left")
+    ax.legend(handles=_legend_markers(RESOURCE_COLORS), bbox_to_anchor=(1.05, 1), loc="upper left")
 
-    plt.show()
+    return _show_or_save(fig, path, format)
 
-def plot_resource_trends(turns, population_data, avg_supply_data, num_villages_data):
-    """Generates a graph tracking village statistics over time."""
-    plt.figure(figsize=(10, 6))
-    plt.plot(turns, population_data, label="Total Population", marker='o', linestyle='-')
-    plt.plot(turns, avg_supply_data, label="Average Supply", marker='s', linestyle='--')
-    plt.plot(turns, num_villages_data, label="Number of Villages", marker='^', linestyle='-.')
+def plot_resource_trends(turns, population_data, avg_supply_data, num_villages_data, path=None, format=None):
+    """Generates a graph tracking village statistics over time (rendered headless to path if given)."""
+    fig = new_figure(path, figsize=(10, 6))
+    ax = fig.add_subplot()
+    ax.plot(turns, population_data, label="Total Population", marker='o', linestyle='-')
+    ax.plot(turns, avg_supply_data, label="Average Supply", marker='s', linestyle='--')
+    ax.plot(turns, num_villages_data, label="Number of Villages", marker='^', linestyle='-.')
     
-    plt.xlabel("Turns")
-    plt.ylabel("Statistics")
-    plt.title("Village Growth & Survival Trends Over Time")
-    plt.legend()
-    plt.grid(True)
-    plt.show()
+    ax.set_xlabel("Turns")
+    ax.set_ylabel("Statistics")
+    ax.set_title("Village Growth & Survival Trends Over Time")
+    ax.legend()
+    ax.grid(True)
+    return _show_or_save(fig, path, format)
 
-def plot_combined_maps(biome_map, river_map, resource_map):
+def plot_combined_maps(biome_map, river_map, resource_map, raster=False, path=None, format=None):
     """
     Generates a side-by-side visualization of the Biome Map, Livestock Map (scatter), and Resource Map (scatter).
 
     Parameters:
-        biome_map (np.array): 2D array of Biome objects.
+        biome_map (BiomeGrid or np.array): Biome grid or 2D array of Biome objects.
         river_map (np.array): 2D boolean array indicating river locations.
-        resource_map (dict): Dictionary mapping (i, j) to resource names.
+        resource_map (np.array or dict): Resource-id grid, or dictionary mapping (i, j) to resource names.
+        raster (bool): Colour livestock and resource tiles into images instead of drawing markers.
+        path (str, file-like or None): Render headless to this file instead of showing
+            (see save_figure for format).
     """
-    map_size = biome_map.shape[0]
-
-    # Define colors for biomes
-    biome_colors = {
-        "Ocean": "#1f77b4", "Coast": "#2ca02c", "Plains": "#bcbd22",
-        "Rainforest": "#17becf", "Desert": "#e377c2", "Tundra": "#7f7f7f",
-        "Mountain": "#8c564b", "Unknown": "#d62728"
-    }
-
-    # Define colors for livestock
-    livestock_colors = {
-        "Camel": "brown", "Reindeer": "white", "Yak": "gray",
-        "Elephant": "purple", "Cattle": "red", "Horse": "darkred",
-        "Sheep": "lightgray", "Pig": "pink", "Mountain Goat": "darkgreen",
-        "Seal": "navy", "Fish": "blue", "Dolphin": "aqua", "Whale": "teal"
-    }
-
-    # Define colors for resources
-    resource_colors = {
-        "Salt": "gray", "Copper": "orange", "Fur": "brown", "Iron": "darkgray",
-        "Rubber": "black", "Herbs": "green", "Wheat": "yellow",
-        "Gold": "gold", "Coal": "black", "Pearls": "pink", "Coral": "cyan"
-    }
+    biome_grid = as_biome_grid(biome_map)
+    map_size = biome_grid.shape[0]
 
     # Generate the biome color map
-    biome_color_map = np.zeros((map_size, map_size, 3))
-    for i in range(map_size):
-        for j in range(map_size):
-            biome_name = biome_map[i, j].name if biome_map[i, j] else "Unknown"
-            color_hex = biome_colors.get(biome_name, "#d62728")
-            biome_color_map[i, j] = tuple(int(color_hex[k:k+2], 16) / 255 for k in (1, 3, 5))
+    biome_color_map = render_biomes(biome_grid)
 
     # Create figure with 3 side-by-side maps
-    fig, ax = plt.subplots(1, 3, figsize=(24, 8))
+    fig = new_figure(path, figsize=(24, 8))
+    ax = fig.subplots(1, 3)
 
     # --- Biome Map ---
     ax[0].imshow(biome_color_map, origin="upper")
@@ -285,12 +466,7 @@ def plot_combined_maps(biome_map, river_map, resource_map):
     ax[1].set_title("Livestock Map", fontsize=16)
 
     # Scatter livestock data
-    for i in range(map_size):
-        for j in range(map_size):
-            animals = biome_map[i, j].livestock if biome_map[i, j] else []
-            for animal in animals:
-                if animal in livestock_colors:
-                    ax[1].scatter(j, i, color=livestock_colors[animal], s=15, alpha=0.8)
+    _draw_overlay(ax[1], map_size, livestock_points(biome_grid), LIVESTOCK_COLORS, 15, 0.8, raster)
 
     # --- Resource Map (Scatter Plot) ---
     ax[2].set_xlim(0, map_size)
@@ -299,46 +475,37 @@ def plot_combined_maps(biome_map, river_map, resource_map):
     ax[2].set_title("Resource Map", fontsize=16)
 
     # Scatter resource data
-    for (i, j), resource in resource_map.items():
-        if resource in resource_colors:
-            ax[2].scatter(j, i, color=resource_colors[resource], marker="o", s=30, alpha=0.9)
+    _draw_overlay(ax[2], map_size, resource_points(resource_map), RESOURCE_COLORS, 30, 0.9, raster)
 
     # Build legends
-    biome_patches = [mpatches.Patch(color=color, label=biome) for biome, color in biome_colors.items()]
-    livestock_patches = [plt.Line2D([0], [0], marker='o', color='w', markersize=8, markerfacecolor=color, label=animal)
-                         for animal, color in livestock_colors.items()]
-    resource_patches = [plt.Line2D([0], [0], marker='o', color='w', markersize=10, markerfacecolor=color, label=resource)
-                        for resource, color in resource_colors.items()]
+    biome_patches = _legend_patches(BIOME_COLORS)
+    livestock_patches = _legend_markers(LIVESTOCK_COLORS)
+    resource_patches = _legend_markers(RESOURCE_COLORS, markersize=10)
 
     # Add legends next to each map
     ax[0].legend(handles=biome_patches, bbox_to_anchor=(1.05, 1), loc="upper left", fontsize=10)
     ax[1].legend(handles=livestock_patches, bbox_to_anchor=(1.05, 1), loc="upper left", fontsize=10)
     ax[2].legend(handles=resource_patches, bbox_to_anchor=(1.05, 1), loc="upper left", fontsize=10)
 
-    plt.tight_layout()
-    plt.show()
+    fig.tight_layout()
+    return _show_or_save(fig, path, format)
 
 
-def plot_world_map(map_size, biome_map, villages, trade_log, collapsed_villages):
-    fig, ax = plt.subplots(figsize=(10, 10))
-    biome_color_map = np.zeros((map_size, map_size, 3))
+def _draw_overlay(ax, map_size, points, colors, size, alpha, raster):
+    """Markers on the blank panels of plot_combined_maps, or tiles painted onto a white image."""
+    if raster:
+        image = np.full((map_size, map_size, 3), 255, dtype=np.uint8)
+        ax.imshow(paint_overlay(image, points, colors), origin="upper")
+    else:
+        scatter_overlay(ax, points, colors, size, alpha)
+
+def plot_world_map(map_size, biome_map, villages, trade_log, collapsed_villages, path=None, format=None):
+    biome_grid = as_biome_grid(biome_map)
+    fig = new_figure(path, figsize=(10, 10))
+    ax = fig.add_subplot()
 
     # Assign RGB colors for biomes
-    biome_colors = {
-        "Ocean": (0.1, 0.4, 0.8),        # Deep blue
-        "Plains": (0.6, 0.8, 0.4),       # Light green
-        "Rainforest": (0.0, 0.5, 0.0),   # Dark green
-        "Coast": (0.7, 0.9, 0.6),        # Sandy/green coast
-        "Tundra": (0.8, 0.8, 0.8),       # Light gray
-        "Desert": (0.9, 0.8, 0.5),       # Pale yellow
-        "Mountain": (0.5, 0.5, 0.5),     # Gray
-        "Unknown": (1.0, 0.0, 0.0)       # Red fallback
-    }
-
-    for i in range(map_size):
-        for j in range(map_size):
-            biome_name = biome_map[i, j].name
-            biome_color_map[i, j] = biome_colors.get(biome_name, biome_colors["Unknown"])
+    biome_color_map = render_biomes(biome_grid, WORLD_BIOME_PALETTE)
 
     ax.imshow(biome_color_map, origin="upper")
     ax.set_title("World Map with Accurate Biome Colors")
@@ -346,19 +513,20 @@ def plot_world_map(map_size, biome_map, villages, trade_log, collapsed_villages)
     ax.set_ylabel("Y Coordinate")
 
     # Build custom legend
-    patches = [mpatches.Patch(color=color, label=biome) for biome, color in biome_colors.items() if biome != "Unknown"]
+    patches = _legend_patches({biome: color for biome, color in WORLD_BIOME_COLORS.items() if biome != "Unknown"})
     ax.legend(handles=patches, bbox_to_anchor=(1.05, 1), loc="upper left")
 
-    plt.tight_layout()
-    plt.show()
+    fig.tight_layout()
+    return _show_or_save(fig, path, format)
 
-def plot_migration_events(migration_log):
+def plot_migration_events(migration_log, path=None, format=None):
     """Stubbed migration plot."""
     if not migration_log:
         print("No migration data to display.")
         return
 
-    fig, ax = plt.subplots(figsize=(10, 5))
+    fig = new_figure(path, figsize=(10, 5))
+    ax = fig.add_subplot()
     turns, migration_counts = zip(*migration_log)
 
     ax.plot(turns, migration_counts, marker="o", linestyle="-", color="blue", label="Migration Events")
@@ -367,4 +535,5 @@ def plot_migration_events(migration_log):
     ax.set_ylabel("Number of Migrants")
     ax.legend()
     ax.grid(True)
-    plt.show()
+    return _show_or_save(fig, path, format)
+
@@ -1,5 +1,6 @@
 import random
-from visualization import plot_world_map, plot_migration_events
+
+from spatial_index import SpatialIndex
 
 class World:
     def __init__(self, map_size, biome_map):
@@ -8,11 +9,42 @@ class World:
         self.villages = []  # This will be redefined in future versions
         self.migration_log = []  # Placeholder for future migration tracking
         self.collapsed_villages = []  # Placeholder for visualization
+        self.spatial_index = SpatialIndex()  # Active villages by position, synced each turn (see update)
+
+    def add_village(self, village):
+        """Registers a newly founded village."""
+        self.villages.append(village)
+        self.spatial_index.add(village)
+
+    def move_village(self, village, position):
+        """Relocates a village and re-indexes it."""
+        village.position = position
+        self.spatial_index.update(village)
+
+    def collapse_village(self, village):
+        """Moves a village from the active list to the collapsed ones."""
+        village.is_active = False
+        self.villages.remove(village)
+        self.collapsed_villages.append(village)
+        self.spatial_index.remove(village)
 
     def update(self, turn):
-        """Placeholder for future simulation logic."""
-        pass
+        """Placeholder for future simulation logic; keeps the spatial index in sync with villages."""
+        self.spatial_index.sync(self.villages)
+
+    def visualize_world(self, path=None):
+        """
+        Displays the world map, or renders it headless to path. Currently no villages or trade routes.
+
+        Plotting is imported here so that simulation-only runs never load matplotlib.
+        """
+        from visualization import plot_world_map
+        return plot_world_map(self.map_size, self.biome_map, self.villages, [], self.collapsed_villages, path=path)
 
-    def visualize_world(self):
-        """Displays the world map. Currently no villages or trade routes."""
-        plot_world_map(self.map_size, self.biome_map, self.villages, [], self.collapsed_villages)
+    def recorder(self, output, **kwargs):
+        """
+        A recorder.WorldRecorder for this world: call its capture(turn) after every update
+        and close() (or use it as a context manager) at the end.
+        """
+        from recorder import WorldRecorder
+        return WorldRecorder(self, output, **kwargs)
@@ -1 +1,6 @@
-from .map import MapGenerator
\ No newline at end of file
+from .map import MapGenerator
+from .biomes import BiomeGrid
+from .cache import MapCache
+from .instrument import Instrumentation
+from .batch import generate_many
+from .stream import ChunkProvider
\ No newline at end of file
@@ -0,0 +1,111 @@
+# batch.py
+import itertools
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from .map import MapGenerator
+from .biomes import BIOME_NAMES, RESOURCE_NAMES
+from .cache import write_layers
+
+# generate_all arguments; every other grid key is passed to the MapGenerator constructor.
+GENERATE_ALL_PARAMS = ("num_rivers", "min_elev_start", "resource_iterations")
+
+# One finished world: its parameters, its summary and where its layers were written.
+WorldResult = namedtuple("WorldResult", ["index", "params", "summary", "path"])
+
+def parameter_grid(grid):
+    """
+    Expands {name: list of values} into the list of every combination, as dicts.
+
+    A list of dicts is returned unchanged, so callers can also pass explicit parameter sets.
+    """
+    if not isinstance(grid, dict):
+        return [dict(params) for params in grid]
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def summarize_world(generator):
+    """
+    Compact statistics of a generated world.
+
+    Returns:
+        dict: Tile count per biome name, the length of every river and the tile count per
+            resource name (resources that never occur are left out).
+    """
+    biome_counts = np.bincount(np.asarray(generator.biome_grid.ids).ravel(), minlength=len(BIOME_NAMES))
+    resource_counts = np.bincount(np.asarray(generator.resource_map).ravel(), minlength=len(RESOURCE_NAMES) + 1)
+    return {
+        "biome_histogram": {name: int(count) for name, count in zip(BIOME_NAMES, biome_counts)},
+        "river_lengths": [int(length) for length in generator.river_lengths],
+        "resource_counts": {name: int(count) for name, count in zip(RESOURCE_NAMES, resource_counts[1:]) if count},
+    }
+
+def _generate_world(index, params, output_dir, summarize, generator_kwargs):
+    """Generates one world, writes its layers under output_dir and returns its WorldResult."""
+    settings = {**generator_kwargs, **{k: v for k, v in params.items() if k not in GENERATE_ALL_PARAMS}}
+    generator = MapGenerator(**settings)
+    generator.generate_all(**{k: v for k, v in params.items() if k in GENERATE_ALL_PARAMS})
+    path = os.path.join(output_dir, f"world_{index:05d}")
+    # Assembled next to the target and swapped in, like MapCache.store: a rerun replaces the
+    # previous world_<i> and readers never see a half-written one.
+    staging = tempfile.mkdtemp(prefix=".staging_", dir=output_dir)
+    write_layers(os.path.join(staging, "new"), generator.layers(), params)
+    if os.path.exists(path):
+        os.replace(path, os.path.join(staging, "old"))
+    os.replace(os.path.join(staging, "new"), path)
+    shutil.rmtree(staging, ignore_errors=True)
+    return WorldResult(index, params, summarize(generator), path)
+
+def generate_many(grid, output_dir=None, workers=None, summarize=summarize_world, **generator_kwargs):
+    """
+    Generates one world per parameter combination on a process pool.
+
+    Results are yielded as worlds finish (not in grid order; use WorldResult.index). Only
+    the summaries travel back to this process: the full layers of world i are written to
+    <output_dir>/world_<i>/ (see cache.write_layers, loadable with cache.read_layers),
+    and at most 2 * workers worlds are in flight, so memory in the caller stays flat
+    however large the grid is.
+
+    Parameters:
+        grid (dict or list): {name: values} expanded with parameter_grid, or a list of
+            parameter dicts. Names are generate_all arguments (GENERATE_ALL_PARAMS) or
+            MapGenerator arguments such as seed and map_size.
+        output_dir (str or None): Where to write full layers; a new temp dir if None
+            (the paths are in the results). May already exist: a world_<i> left by an
+            earlier run is overwritten.
+        workers (int or None): Pool size; None uses every core, 1 generates in this process.
+        summarize (callable): summarize(generator) -> picklable summary.
+        **generator_kwargs: MapGenerator arguments shared by every world (e.g. map_size).
+
+    Yields:
+        WorldResult: index into the expanded grid, params, summary and layer path.
+    """
+    combinations = parameter_grid(grid)
+    if output_dir is None:
+        output_dir = tempfile.mkdtemp(prefix="worlds_")
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = ((index, params, output_dir, summarize, generator_kwargs) for index, params in enumerate(combinations))
+
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        for args in tasks:
+            yield _generate_world(*args)
+        return
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = set()
+        for args in tasks:
+            pending.add(pool.submit(_generate_world, *args))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
@@ -1,6 +1,9 @@
+import operator
 import random
 import numpy as np
 
+from .chunks import as_random_source
+
 class Biome:
     def __init__(self, name, terrain_type, temperature, humidity, fertility, climate_zone, 
                  elevation, livestock, special_features, supply, security, satisfaction):
@@ -34,136 +37,454 @@ biome_data = {
     "Mountain": {"terrain": "Rocky", "climate_zone": "Continental", "special_features": ["Snow Peaks"], "supply": 34, "security": 60, "satisfaction": 68},
 }
 
-def determine_livestock(biome_name: str) -> list:
+# Biome classification rules over the normalised base maps, checked in order: the first
+# rule whose (field, operator, threshold) conditions all hold assigns the biome, and
+# tiles matching no rule get default_biome. Fields are "elevation", "moisture" and
+# "temperature". New biomes only need an entry here and in biome_data.
+biome_rules = [
+    ("Ocean", [("elevation", "<", -0.05)]),
+    ("Coast", [("elevation", ">=", -0.2), ("elevation", "<=", 0.2), ("moisture", ">", 0.4)]),
+    ("Mountain", [("elevation", ">", 0.7)]),
+    ("Rainforest", [("moisture", ">", 0.6), ("temperature", ">", 0.6)]),
+    ("Desert", [("moisture", "<", 0.4), ("temperature", ">", 0.5)]),
+    ("Tundra", [("temperature", "<", 0.3)]),
+]
+default_biome = "Plains"
+
+# Per-biome (animal, probability) candidates used by determine_livestock.
+livestock_probabilities = {
+    "Desert": [("Camel", 0.2)],
+    "Tundra": [("Reindeer", 0.1), ("Yak", 0.2)],
+    "Rainforest": [("Elephant", 0.1)],
+    "Plains": [("Cattle", 0.15), ("Horse", 0.2), ("Sheep", 0.3), ("Pig", 0.3)],
+    "Mountain": [("Mountain Goat", 0.5)],
+    "Coast": [("Seal", 0.2), ("Fish", 0.8)],
+    "Ocean": [("Dolphin", 0.02), ("Whale", 0.01)],
+}
+
+# Per-biome (feature, probability) candidates used by determine_special_features.
+feature_probabilities = {
+    "Desert": [("Oasis", 0.01), ("Sand Dunes", 0.2), ("Rocky Outcrops", 0.2)],
+    "Tundra": [("Permafrost", 0.1), ("Glacier", 0.1)],
+    "Rainforest": [("Dense Canopy", 0.2), ("Hidden Waterfalls", 0.05)],
+    "Plains": [("Rolling Hills", 0.1), ("Wildflower Fields", 0.1)],
+    "Mountains": [("Caves", 0.2), ("Snow Peaks", 0.3)],
+}
+
+def _draw_names(probabilities, biome_name):
+    """One random.random() draw per candidate of the biome, in table order (the original per-tile sampling)."""
+    return [name for name, probability in probabilities.get(biome_name, ()) if random.random() < probability]
+
+def determine_livestock(biome_name: str, rng=None) -> list:
     """
     Probabilistically assigns livestock/animals based on the given biome name.
+
+    Per-tile wrapper around sample_livestock. Without rng it draws from the global
+    random module as it always has, so random.seed() keeps seeded callers reproducible.
     
     Parameters:
         biome_name (str): The name of the biome (e.g., "Desert", "Tundra", "Rainforest", etc.)
+        rng (np.random.Generator, TileRandom, int or None): Random source or seed; None
+            uses the random module.
         
     Returns:
         list: A list of animals that were randomly chosen for that biome.
     """
-    livestock_probabilities = {
-        "Desert": [("Camel", 0.2)],
-        "Tundra": [("Reindeer", 0.1), ("Yak", 0.2)],
-        "Rainforest": [("Elephant", 0.1)],
-        "Plains": [("Cattle", 0.15), ("Horse", 0.2), ("Sheep", 0.3), ("Pig", 0.3)],
-        "Mountain": [("Mountain Goat", 0.5)],
-        "Coast": [("Seal", 0.2), ("Fish", 0.8)],
-        "Ocean": [("Dolphin", 0.02), ("Whale", 0.01)],
-    }
-    
-    animals = []
-    if biome_name in livestock_probabilities:
-        for animal, probability in livestock_probabilities[biome_name]:
-            if random.random() < probability:
-                animals.append(animal)
-    return animals
+    if rng is None:
+        return _draw_names(livestock_probabilities, biome_name)
+    if biome_name not in BIOME_IDS:
+        return []
+    mask = sample_livestock(np.array([BIOME_IDS[biome_name]]), rng)[0]
+    return decode_mask(mask, LIVESTOCK_NAMES)
 
 
-def determine_special_features(biome_name: str) -> list:
+def determine_special_features(biome_name: str, rng=None) -> list:
     """
     Probabilistically assigns special features based on the given biome name.
+
+    Per-tile wrapper around sample_special_features. Without rng it draws from the
+    global random module as it always has, so random.seed() keeps seeded callers
+    reproducible.
     
     Parameters:
         biome_name (str): The name of the biome (e.g., "Desert", "Tundra", etc.)
+        rng (np.random.Generator, TileRandom, int or None): Random source or seed; None
+            uses the random module.
         
     Returns:
         list: A list of special features that were randomly chosen.
     """
-    feature_probabilities = {
-        "Desert": [("Oasis", 0.01), ("Sand Dunes", 0.2), ("Rocky Outcrops", 0.2)],
-        "Tundra": [("Permafrost", 0.1), ("Glacier", 0.1)],
-        "Rainforest": [("Dense Canopy", 0.2), ("Hidden Waterfalls", 0.05)],
-        "Plains": [("Rolling Hills", 0.1), ("Wildflower Fields", 0.1)],
-        "Mountains": [("Caves", 0.2), ("Snow Peaks", 0.3)],
-    }
-    
-    features = []
-    if biome_name in feature_probabilities:
-        for feature, probability in feature_probabilities[biome_name]:
-            if random.random() < probability:
-                features.append(feature)
-    return features
+    if rng is None:
+        return _draw_names(feature_probabilities, biome_name)
+    if biome_name not in BIOME_IDS:
+        return []
+    mask = sample_special_features(np.array([BIOME_IDS[biome_name]]), rng)[0]
+    return decode_mask(mask, FEATURE_NAMES)
+
+# Biome ids are indices into BIOME_NAMES (the order of biome_data).
+BIOME_NAMES = tuple(biome_data)
+BIOME_IDS = {name: biome_id for biome_id, name in enumerate(BIOME_NAMES)}
+
+# Bit k of a livestock / feature mask stands for LIVESTOCK_NAMES[k] / FEATURE_NAMES[k].
+LIVESTOCK_NAMES = tuple(dict.fromkeys(animal for options in livestock_probabilities.values()
+                                      for animal, _ in options))
+FEATURE_NAMES = tuple(dict.fromkeys(feature for options in feature_probabilities.values()
+                                    for feature, _ in options))
 
-def generate_resource_map_ca(biome_map, map_size, iterations=3):
+def _candidate_slots(probabilities, vocabulary):
     """
-    Uses cellular automata to generate naturally clustered resource distributions 
-    while considering resource rarity.
+    Lays a per-biome candidate table out as (biome id, slot) lookup arrays.
+
+    Slot k of a biome holds its k-th candidate's bit and probability; unused slots have
+    probability 0. Biome names that are not in BIOME_IDS never match and are skipped.
+    """
+    num_slots = max(len(options) for options in probabilities.values())
+    bits = np.zeros((len(BIOME_NAMES), num_slots), dtype=np.uint16)
+    probs = np.zeros((len(BIOME_NAMES), num_slots))
+    for biome_name, options in probabilities.items():
+        if biome_name not in BIOME_IDS:
+            continue
+        for slot, (name, probability) in enumerate(options):
+            bits[BIOME_IDS[biome_name], slot] = 1 << vocabulary.index(name)
+            probs[BIOME_IDS[biome_name], slot] = probability
+    return bits, probs
+
+_LIVESTOCK_SLOTS = _candidate_slots(livestock_probabilities, LIVESTOCK_NAMES)
+_FEATURE_SLOTS = _candidate_slots(feature_probabilities, FEATURE_NAMES)
+
+def _sample_slots(biome_ids, slots, rng):
+    bits, probs = slots
+    rng = as_random_source(rng)
+    mask = np.zeros(np.shape(biome_ids), dtype=np.uint16)
+    for slot in range(probs.shape[1]):
+        hit = rng.random(mask.shape) < probs[biome_ids, slot]
+        mask |= np.where(hit, bits[biome_ids, slot], 0).astype(np.uint16)
+    return mask
+
+def sample_livestock(biome_ids, rng=None):
+    """
+    Samples livestock for every tile at once.
+
+    Each candidate slot of livestock_probabilities is one whole-grid draw from rng,
+    compared against a (biome id -> probability) lookup, so the cost does not depend on
+    how many animals a biome lists.
 
     Parameters:
-        biome_map (np.array): 2D array of Biome objects.
-        map_size (int): The size of the map (assuming square).
+        biome_ids (np.array): Array of biome ids (indices into BIOME_NAMES).
+        rng (np.random.Generator, TileRandom, int or None): Random source or seed.
+
+    Returns:
+        np.array: uint16 bitmasks over LIVESTOCK_NAMES with the shape of biome_ids.
+    """
+    return _sample_slots(biome_ids, _LIVESTOCK_SLOTS, rng)
+
+def sample_special_features(biome_ids, rng=None):
+    """Samples special features for every tile at once (see sample_livestock)."""
+    return _sample_slots(biome_ids, _FEATURE_SLOTS, rng)
+
+_RULE_OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+def compile_biome_classifier(rules=None, default=None):
+    """
+    Compiles a biome rule table into a vectorized classifier.
+
+    Parameters:
+        rules (list): Ordered (biome_name, conditions) pairs; defaults to biome_rules.
+        default (str): Biome assigned when no rule matches; defaults to default_biome.
+
+    Returns:
+        callable: classify(elevation, moisture, temperature) -> uint8 biome-id array,
+        labelling the whole map with one np.select.
+    """
+    rules = biome_rules if rules is None else rules
+    default_id = BIOME_IDS[default_biome if default is None else default]
+    compiled = [(BIOME_IDS[name], [(field, _RULE_OPERATORS[op], threshold) for field, op, threshold in conditions])
+                for name, conditions in rules]
+
+    def classify(elevation, moisture, temperature):
+        fields = {"elevation": elevation, "moisture": moisture, "temperature": temperature}
+        choices, conditions = [], []
+        for biome_id, checks in compiled:
+            matched = np.ones(np.shape(elevation), dtype=bool)
+            for field, compare, threshold in checks:
+                matched &= compare(fields[field], threshold)
+            conditions.append(matched)
+            choices.append(biome_id)
+        return np.select(conditions, choices, default_id).astype(np.uint8)
+
+    return classify
+
+def classify_biomes(elevation_map, moisture_map, temperature_map, classifier=None):
+    """
+    Labels every tile and derives the per-tile biome attributes in one vectorized pass.
+
+    Parameters:
+        elevation_map, moisture_map, temperature_map (np.array): Normalised base maps.
+        classifier (callable): Output of compile_biome_classifier; defaults to biome_rules.
+
+    Returns:
+        BiomeGrid: Grid with ids, °C temperature, humidity, fertility and elevation in
+        metres filled in (livestock and special features left empty).
+    """
+    classifier = classifier or default_classifier
+    temperature_c = temperature_map * 40 - 10
+    return BiomeGrid(
+        ids=classifier(elevation_map, moisture_map, temperature_map),
+        temperature=temperature_c,
+        humidity=moisture_map,
+        fertility=np.clip(moisture_map * (1 - np.abs(temperature_c) / 40), 0.1, 1.0),
+        elevation=(elevation_map + 1) * 1000,
+        livestock=np.zeros(elevation_map.shape, dtype=np.uint16),
+        special_features=np.zeros(elevation_map.shape, dtype=np.uint16),
+    )
+
+def encode_names(names, vocabulary):
+    """Packs a list of names into a bitmask over the given vocabulary."""
+    mask = 0
+    for name in names:
+        mask |= 1 << vocabulary.index(name)
+    return mask
+
+def decode_mask(mask, vocabulary):
+    """Unpacks a bitmask into the list of names it stands for."""
+    return [name for bit, name in enumerate(vocabulary) if int(mask) >> bit & 1]
+
+class BiomeGrid:
+    """
+    Compact per-tile biome storage.
+
+    Holds a uint8 biome-id grid with parallel float32 attribute arrays and uint16
+    bitmasks for livestock and special features, instead of one Biome object per tile.
+    Indexing a single tile (grid[i, j]) materialises its Biome on demand; the object is
+    kept so repeated lookups of the same tile return the same instance.
+
+    Attributes:
+        ids (np.array): uint8 biome ids (indices into BIOME_NAMES).
+        temperature (np.array): float32 temperature in °C.
+        humidity (np.array): float32 moisture in [0, 1].
+        fertility (np.array): float32 fertility in [0.1, 1].
+        elevation (np.array): float32 elevation in metres.
+        livestock (np.array): uint16 bitmask over LIVESTOCK_NAMES.
+        special_features (np.array): uint16 bitmask over FEATURE_NAMES.
+    """
+
+    def __init__(self, ids, temperature, humidity, fertility, elevation, livestock, special_features):
+        self.ids = np.asanyarray(ids, dtype=np.uint8)
+        self.temperature = np.asanyarray(temperature, dtype=np.float32)
+        self.humidity = np.asanyarray(humidity, dtype=np.float32)
+        self.fertility = np.asanyarray(fertility, dtype=np.float32)
+        self.elevation = np.asanyarray(elevation, dtype=np.float32)
+        self.livestock = np.asanyarray(livestock, dtype=np.uint16)
+        self.special_features = np.asanyarray(special_features, dtype=np.uint16)
+        self._tiles = {}
+
+    @classmethod
+    def empty(cls, shape):
+        """Allocates a zeroed grid (every tile Ocean with no livestock or features)."""
+        return cls(np.zeros(shape, dtype=np.uint8),
+                   *(np.zeros(shape, dtype=np.float32) for _ in range(4)),
+                   np.zeros(shape, dtype=np.uint16), np.zeros(shape, dtype=np.uint16))
+
+    @classmethod
+    def from_biome_map(cls, biome_map):
+        """Packs a 2D object array of Biome instances into a BiomeGrid."""
+        grid = cls.empty(biome_map.shape)
+        for (i, j), biome in np.ndenumerate(biome_map):
+            grid.ids[i, j] = BIOME_IDS[biome.name]
+            grid.temperature[i, j] = biome.temperature
+            grid.humidity[i, j] = biome.humidity
+            grid.fertility[i, j] = biome.fertility
+            grid.elevation[i, j] = biome.elevation
+            grid.livestock[i, j] = encode_names(biome.livestock, LIVESTOCK_NAMES)
+            grid.special_features[i, j] = encode_names(biome.special_features, FEATURE_NAMES)
+        return grid
+
+    @property
+    def shape(self):
+        return self.ids.shape
+
+    def __len__(self):
+        return self.ids.shape[0]
+
+    def __getitem__(self, index):
+        i, j = index
+        return self.biome(i, j)
+
+    def name_at(self, i, j):
+        return BIOME_NAMES[self.ids[i, j]]
+
+    def livestock_at(self, i, j):
+        return decode_mask(self.livestock[i, j], LIVESTOCK_NAMES)
+
+    def features_at(self, i, j):
+        return decode_mask(self.special_features[i, j], FEATURE_NAMES)
+
+    def mask(self, *names):
+        """Boolean grid of tiles whose biome is one of the given names."""
+        return np.isin(self.ids, [BIOME_IDS[name] for name in names])
+
+    def biome(self, i, j):
+        """Returns the Biome object for tile (i, j), creating it on first access."""
+        key = (int(i), int(j))
+        tile = self._tiles.get(key)
+        if tile is None:
+            tile = self._tiles[key] = self._make_biome(key)
+        return tile
+
+    def _make_biome(self, key):
+        name = self.name_at(*key)
+        biome_info = biome_data[name]
+        return Biome(
+            name=name,
+            terrain_type=biome_info["terrain"],
+            temperature=float(self.temperature[key]),
+            humidity=float(self.humidity[key]),
+            fertility=float(self.fertility[key]),
+            climate_zone=biome_info["climate_zone"],
+            elevation=float(self.elevation[key]),
+            livestock=self.livestock_at(*key),
+            special_features=self.features_at(*key),
+            supply=biome_info["supply"],
+            security=biome_info["security"],
+            satisfaction=biome_info["satisfaction"]
+        )
+
+    def to_biome_map(self):
+        """Materialises the full 2D object array of Biome instances (compatibility view)."""
+        biome_map = np.empty(self.shape, dtype=object)
+        for key in np.ndindex(self.shape):
+            biome_map[key] = self._tiles.get(key) or self._make_biome(key)
+        return biome_map
+
+def as_biome_grid(biome_map):
+    """Returns biome_map as a BiomeGrid, packing it first if it is an object array of Biomes."""
+    if isinstance(biome_map, BiomeGrid):
+        return biome_map
+    return BiomeGrid.from_biome_map(biome_map)
+
+default_classifier = compile_biome_classifier()
+
+# Biome-specific resources with rarity levels
+biome_resources = {
+    "Desert": [("Salt", "common"), ("Copper", "rare")],
+    "Tundra": [("Fur", "rare"), ("Iron", "uncommon")],
+    "Rainforest": [("Rubber", "uncommon"), ("Herbs", "common")],
+    "Plains": [("Wheat", "common")],
+    "Mountain": [("Gold", "rare"), ("Iron", "uncommon"), ("Coal", "common")],
+    "Coast": [("Pearls", "rare")],
+    "Ocean": [("Coral", "rare")]
+}
+
+# Rarity modifiers: affects initial placement & spread probability
+rarity_settings = {
+    "common": {"init_prob": 0.15, "spread_prob": 0.8},  # High start, easy spread
+    "uncommon": {"init_prob": 0.08, "spread_prob": 0.6},  # Moderate start, moderate spread
+    "rare": {"init_prob": 0.04, "spread_prob": 0.4},  # Few initial tiles, harder to spread
+    "very_rare": {"init_prob": 0.02, "spread_prob": 0.25}  # Extremely rare, very small spread
+}
+
+# Resource ids in a resource grid: 0 is "no resource", k is RESOURCE_NAMES[k - 1].
+RESOURCE_NAMES = tuple(dict.fromkeys(resource for options in biome_resources.values()
+                                     for resource, _ in options))
+RESOURCE_IDS = {name: resource_id for resource_id, name in enumerate(RESOURCE_NAMES, start=1)}
+
+def _resource_tables():
+    """
+    Precomputes the CA lookups from biome_resources and rarity_settings.
+
+    Returns:
+        tuple: (seed_ids, seed_probs) of shape (biomes, slots) holding each biome's k-th
+        resource and its init_prob, and spread_probs of shape (biomes, resources + 1)
+        holding the spread_prob of a resource on a tile of that biome. Resources a biome
+        does not list spread as "common"; id 0 (no resource) never spreads.
+    """
+    num_slots = max(len(options) for options in biome_resources.values())
+    seed_ids = np.zeros((len(BIOME_NAMES), num_slots), dtype=np.uint8)
+    seed_probs = np.zeros((len(BIOME_NAMES), num_slots))
+    spread_probs = np.full((len(BIOME_NAMES), len(RESOURCE_NAMES) + 1), rarity_settings["common"]["spread_prob"])
+    spread_probs[:, 0] = 0.0
+    for biome_name, options in biome_resources.items():
+        biome_id = BIOME_IDS[biome_name]
+        for slot, (resource, rarity) in enumerate(options):
+            seed_ids[biome_id, slot] = RESOURCE_IDS[resource]
+            seed_probs[biome_id, slot] = rarity_settings[rarity]["init_prob"]
+        # The first listing of a resource decides its rarity, like the old next(...) scan.
+        for resource, rarity in reversed(options):
+            spread_probs[biome_id, RESOURCE_IDS[resource]] = rarity_settings[rarity]["spread_prob"]
+    return seed_ids, seed_probs, spread_probs
+
+_RESOURCE_SEED_IDS, _RESOURCE_SEED_PROBS, _RESOURCE_SPREAD_PROBS = _resource_tables()
+
+def generate_resource_grid(biome_ids, iterations=3, rng=None):
+    """
+    Vectorized cellular automaton for clustered, rarity-aware resource placement.
+
+    Same rules as the original per-tile automaton: every listed resource of a tile's
+    biome seeds with its init_prob (later listings win), then on each iteration an
+    occupied tile keeps its resource with the spread_prob of that resource, and an
+    empty tile adopts a uniformly chosen occupied 4-neighbour's resource with the
+    spread_prob of that resource. Neighbours come from shifted views of the grid and
+    each step makes two whole-grid draws from rng.
+
+    Parameters:
+        biome_ids (np.array): 2D array of biome ids (indices into BIOME_NAMES).
         iterations (int): Number of cellular automata iterations.
+        rng (np.random.Generator, TileRandom, int or None): Random source or seed.
 
     Returns:
-        dict: Dictionary mapping tile positions (i, j) to a resource name.
-    """
-
-    # Define biome-specific resources with rarity levels
-    biome_resources = {
-        "Desert": [("Salt", "common"), ("Copper", "rare")],
-        "Tundra": [("Fur", "rare"), ("Iron", "uncommon")],
-        "Rainforest": [("Rubber", "uncommon"), ("Herbs", "common")],
-        "Plains": [("Wheat", "common")],
-        "Mountain": [("Gold", "rare"), ("Iron", "uncommon"), ("Coal", "common")],
-        "Coast": [("Pearls", "rare")],
-        "Ocean": [("Coral", "rare")]
-    }
-
-    # Rarity modifiers: affects initial placement & spread probability
-    rarity_settings = {
-        "common": {"init_prob": 0.15, "spread_prob": 0.8},  # High start, easy spread
-        "uncommon": {"init_prob": 0.08, "spread_prob": 0.6},  # Moderate start, moderate spread
-        "rare": {"init_prob": 0.04, "spread_prob": 0.4},  # Few initial tiles, harder to spread
-        "very_rare": {"init_prob": 0.02, "spread_prob": 0.25}  # Extremely rare, very small spread
-    }
-
-    resource_map = {}
+        np.array: 2D uint8 grid of resource ids (0 = none, see RESOURCE_NAMES).
+    """
+    rng = as_random_source(rng)
+    biome_ids = np.asarray(biome_ids)
+    shape = biome_ids.shape
 
     # Step 1: Initialize resource "seeds" based on rarity
-    ca_grid = np.full((map_size, map_size), None, dtype=object)
-
-    for i in range(map_size):
-        for j in range(map_size):
-            biome_name = biome_map[i, j].name
-            if biome_name in biome_resources:
-                for resource, rarity in biome_resources[biome_name]:
-                    if random.random() < rarity_settings[rarity]["init_prob"]:  # Rarity-controlled start
-                        ca_grid[i, j] = resource
+    grid = np.zeros(shape, dtype=np.uint8)
+    for slot in range(_RESOURCE_SEED_IDS.shape[1]):
+        seeded = rng.random(shape, dtype=np.float32) < _RESOURCE_SEED_PROBS[biome_ids, slot]
+        grid[seeded] = _RESOURCE_SEED_IDS[biome_ids, slot][seeded]
 
     # Step 2: Cellular Automata Iterations
     for _ in range(iterations):
-        new_grid = np.full((map_size, map_size), None, dtype=object)
-
-        for i in range(map_size):
-            for j in range(map_size):
-                biome_name = biome_map[i, j].name
-
-                # Count neighboring resources
-                neighbors = []
-                for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]:  # 4-way adjacency
-                    ni, nj = i + di, j + dj
-                    if 0 <= ni < map_size and 0 <= nj < map_size and ca_grid[ni, nj]:
-                        neighbors.append(ca_grid[ni, nj])
-
-                if ca_grid[i, j]:  # If tile already has a resource, it persists
-                    rarity = next((r for res, r in biome_resources[biome_name] if res == ca_grid[i, j]), "common")
-                    if random.random() < rarity_settings[rarity]["spread_prob"]:  
-                        new_grid[i, j] = ca_grid[i, j]
-                elif neighbors:  # If tile is empty but has neighbors with resources
-                    chosen_neighbor = random.choice(neighbors)
-                    rarity = next((r for res, r in biome_resources[biome_name] if res == chosen_neighbor), "common")
-                    if random.random() < rarity_settings[rarity]["spread_prob"]:  # Lower chance for rare
-                        new_grid[i, j] = chosen_neighbor
-
-        ca_grid = new_grid  # Update for next iteration
-
-    # Step 3: Convert CA Grid to Resource Map
-    for i in range(map_size):
-        for j in range(map_size):
-            if ca_grid[i, j]:
-                resource_map[(i, j)] = ca_grid[i, j]
-
-    return resource_map
+        padded = np.pad(grid, 1)
+        neighbors = np.stack([padded[:-2, 1:-1], padded[2:, 1:-1], padded[1:-1, :-2], padded[1:-1, 2:]])
+        occupied = neighbors > 0
+        rank = np.cumsum(occupied, axis=0, dtype=np.uint8)
+        pick = (rng.random(shape, dtype=np.float32) * rank[-1]).astype(np.uint8) + 1
+
+        candidate = grid.copy()
+        empty = grid == 0
+        for direction in range(4):
+            chosen = empty & occupied[direction] & (rank[direction] == pick)
+            candidate[chosen] = neighbors[direction][chosen]
+
+        keep = rng.random(shape, dtype=np.float32) < _RESOURCE_SPREAD_PROBS[biome_ids, candidate]
+        grid = np.where(keep, candidate, 0).astype(np.uint8)
+
+    return grid
+
+def resource_grid_to_dict(resource_grid):
+    """Converts a resource-id grid into the {(i, j): resource name} format."""
+    rows, cols = np.nonzero(resource_grid)
+    return {(int(i), int(j)): RESOURCE_NAMES[resource_grid[i, j] - 1] for i, j in zip(rows, cols)}
+
+def generate_resource_map_ca(biome_map, map_size, iterations=3, rng=None, as_dict=False):
+    """
+    Uses cellular automata to generate naturally clustered resource distributions 
+    while considering resource rarity.
+
+    Parameters:
+        biome_map (BiomeGrid or np.array): Biome grid or 2D array of Biome objects.
+        map_size (int): The size of the map (assuming square).
+        iterations (int): Number of cellular automata iterations.
+        rng (np.random.Generator, TileRandom, int or None): Random source or seed.
+        as_dict (bool): Return the old {(i, j): resource name} dictionary instead of the grid.
+
+    Returns:
+        np.array or dict: uint8 resource-id grid (see RESOURCE_NAMES), or a dictionary
+        mapping tile positions (i, j) to a resource name when as_dict is set.
+    """
+    resource_grid = generate_resource_grid(as_biome_grid(biome_map).ids, iterations, rng)
+    if as_dict:
+        return resource_grid_to_dict(resource_grid)
+    return resource_grid
@@ -0,0 +1,130 @@
+# cache.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+# Bump whenever a change alters generated output, so entries from older code stop matching.
+GENERATOR_VERSION = 2
+
+def write_layers(directory, layers, params=None):
+    """
+    Writes {layer name: array} as <name>.npy files plus a manifest.json into a new directory.
+
+    Returns:
+        dict: The manifest (params, creation time, total nbytes and layer dtypes/shapes).
+    """
+    os.makedirs(directory)
+    manifest = {"params": params, "created": time.time(), "nbytes": 0, "layers": {}}
+    for name, array in layers.items():
+        array = np.asarray(array)
+        np.save(os.path.join(directory, f"{name}.npy"), array)
+        manifest["layers"][name] = {"dtype": array.dtype.str, "shape": list(array.shape)}
+        manifest["nbytes"] += array.nbytes
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def read_layers(directory, mmap_mode="c"):
+    """Loads a write_layers directory as {layer name: memory-mapped array}."""
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+    return {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in manifest["layers"]}
+
+class MapCache:
+    """
+    Content-addressed on-disk cache of generated map layers.
+
+    An entry lives in <directory>/<key>/ as one raw .npy file per layer plus a
+    manifest.json recording the generation parameters and layer shapes. Keys are
+    SHA-256 hashes of the parameters and GENERATOR_VERSION, so an entry can only be
+    found again by generating with exactly the same inputs. Layers load as
+    copy-on-write memory maps: a hit costs a few file opens no matter how large the
+    map is, and callers may modify the arrays without touching the cache.
+
+    Parameters:
+        directory (str): Cache root; created if missing.
+        max_bytes (int): Size limit for all entries. After every store, least recently
+            used entries are deleted until the cache fits.
+    """
+
+    def __init__(self, directory, max_bytes=4 * 2**30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(params):
+        """Hex digest addressing the outputs of generating with params (a JSON-able dict)."""
+        payload = json.dumps({"version": GENERATOR_VERSION, "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _manifest_path(self, key):
+        return os.path.join(self.directory, key, "manifest.json")
+
+    def __contains__(self, key):
+        return os.path.exists(self._manifest_path(key))
+
+    def load(self, key):
+        """
+        Returns {layer name: memory-mapped array} for key, or None on a miss.
+
+        Loading counts as a use for LRU eviction.
+        """
+        try:
+            layers = read_layers(os.path.join(self.directory, key))
+        except FileNotFoundError:
+            return None
+        os.utime(self._manifest_path(key))  # The manifest mtime is the entry's last use.
+        return layers
+
+    def store(self, key, layers, params=None):
+        """
+        Writes the given {layer name: array} under key and evicts down to max_bytes.
+
+        The entry is assembled in a temporary directory and renamed into place, so
+        concurrent readers never see a partial entry.
+        """
+        entry = os.path.join(self.directory, key)
+        if os.path.exists(entry):
+            return
+        staging = os.path.join(tempfile.mkdtemp(prefix=".staging_", dir=self.directory), key)
+        write_layers(staging, layers, params)
+        try:
+            os.rename(staging, entry)
+        except OSError:  # Another process stored the same key first.
+            pass
+        shutil.rmtree(os.path.dirname(staging), ignore_errors=True)
+        self.evict()
+
+    def entries(self):
+        """(key, nbytes, last used) of every entry, least recently used first."""
+        entries = []
+        for key in os.listdir(self.directory):
+            path = self._manifest_path(key)
+            try:
+                with open(path) as f:
+                    nbytes = json.load(f)["nbytes"]
+                entries.append((key, nbytes, os.path.getmtime(path)))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self):
+        """Deletes least recently used entries until the cache is within max_bytes."""
+        entries = self.entries()
+        total = sum(nbytes for _, nbytes, _ in entries)
+        for key, nbytes, _ in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+            total -= nbytes
+
+    def clear(self):
+        for key, _, _ in self.entries():
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
@@ -0,0 +1,135 @@
+# chunks.py
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .perlin import lattice_uniform
+
+# Generation stages that draw random numbers, in spawn-key order (see stage_seed).
+SEED_STAGES = ("plates", "noise", "livestock", "features", "rivers", "resources")
+
+class Chunk(namedtuple("Chunk", ["rows", "cols", "halo_rows", "halo_cols"])):
+    """
+    One block of a chunked map.
+
+    rows/cols are the slices the chunk owns; halo_rows/halo_cols are the same block
+    grown by the halo and clipped to the map, i.e. the window a neighbourhood stage
+    has to read to compute the chunk exactly.
+    """
+
+    @property
+    def inner(self):
+        """Slices selecting the chunk inside an array that covers the halo window."""
+        return (slice(self.rows.start - self.halo_rows.start, self.rows.stop - self.halo_rows.start),
+                slice(self.cols.start - self.halo_cols.start, self.cols.stop - self.halo_cols.start))
+
+    @property
+    def coords(self):
+        """Map row and column coordinates of the chunk as 1D arrays."""
+        return np.arange(self.rows.start, self.rows.stop), np.arange(self.cols.start, self.cols.stop)
+
+def iter_chunks(shape, chunk_size, halo=0):
+    """
+    Splits a map into chunk_size x chunk_size blocks in row-major order.
+
+    Parameters:
+        shape (tuple): (rows, cols) of the map.
+        chunk_size (int): Side length of a chunk; edge chunks are smaller.
+        halo (int): Overlap added around every chunk's halo window.
+
+    Yields:
+        Chunk: The chunk slices and its halo window.
+    """
+    rows, cols = shape
+    for row0 in range(0, rows, chunk_size):
+        row1 = min(row0 + chunk_size, rows)
+        for col0 in range(0, cols, chunk_size):
+            col1 = min(col0 + chunk_size, cols)
+            yield Chunk(slice(row0, row1), slice(col0, col1),
+                        slice(max(row0 - halo, 0), min(row1 + halo, rows)),
+                        slice(max(col0 - halo, 0), min(col1 + halo, cols)))
+
+def open_layer(storage_dir, name, shape, dtype):
+    """Creates a zero-filled, memory-mapped <name>.npy layer in storage_dir (loadable with np.load)."""
+    path = os.path.join(storage_dir, f"{name}.npy")
+    return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+class TileRandom:
+    """
+    Random numbers addressed by tile instead of by stream position.
+
+    Each call to random() is one numbered draw, and the value a tile gets from draw n
+    is a hash of (seed, n, row, col) in map coordinates. Two windows that make the same
+    sequence of draws therefore agree wherever they overlap, which is what lets a chunk
+    and its halo reproduce the values a whole-map pass would have drawn.
+
+    Parameters:
+        seed (int): Seed mixed into every value.
+        row0 (int): Map row of the first row of the window being sampled.
+        col0 (int): Map column of the first column of the window being sampled.
+    """
+
+    def __init__(self, seed, row0=0, col0=0):
+        self.seed = seed
+        self.row0 = row0
+        self.col0 = col0
+        self.draws = 0
+
+    def random(self, size, dtype=np.float64):
+        """Uniform [0, 1) values for a window of the given 2D size (same call as Generator.random)."""
+        rows = np.arange(self.row0, self.row0 + size[0])[:, None]
+        cols = np.arange(self.col0, self.col0 + size[1])[None, :]
+        values = lattice_uniform(self.seed, self.draws, rows, cols)
+        self.draws += 1
+        return values.astype(dtype)
+
+def as_random_source(rng):
+    """Passes a TileRandom through; anything else goes through np.random.default_rng."""
+    if isinstance(rng, TileRandom):
+        return rng
+    return np.random.default_rng(rng)
+
+def stage_seed(seed, stage, chunk=None):
+    """
+    SeedSequence of one generation stage, optionally narrowed to one chunk.
+
+    The stage's sequence is child SEED_STAGES.index(stage) of SeedSequence(seed), the
+    same one SeedSequence(seed).spawn() would hand out, and a chunk's sequence is keyed
+    by its map origin. Streams are addressed directly instead of spawned in order, so
+    every chunk gets the same stream no matter which process generates it or when.
+
+    Parameters:
+        seed (int): Map seed.
+        stage (str): One of SEED_STAGES.
+        chunk (Chunk or None): Chunk to derive a stream for.
+
+    Returns:
+        np.random.SeedSequence: Seed for np.random.default_rng or generate_state.
+    """
+    key = (SEED_STAGES.index(stage),)
+    if chunk is not None:
+        key += (chunk.rows.start, chunk.cols.start)
+    return np.random.SeedSequence(seed, spawn_key=key)
+
+def map_chunks(function, tasks, workers=None):
+    """
+    Applies function to every argument tuple in tasks and yields the results in order.
+
+    With workers > 1 the calls run in a process pool. Tasks are submitted lazily and at
+    most 2 * workers are in flight, so only a few chunks of input and output are held
+    in memory at once.
+    """
+    if not workers or workers == 1:
+        for args in tasks:
+            yield function(*args)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for args in tasks:
+            pending.append(pool.submit(function, *args))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
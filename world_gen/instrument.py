@@ -0,0 +1,106 @@
+# instrument.py
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+from types import SimpleNamespace
+
+# One timed run of a stage (for chunked generation, one chunk of it).
+StageRecord = namedtuple("StageRecord", ["name", "wall", "cpu", "peak_bytes", "items"])
+
+# Yields a throwaway counter so `with measure(...) as stage: stage.items = n` also works when off.
+_DISABLED = nullcontext(SimpleNamespace(items=0))
+
+class Instrumentation:
+    """
+    Collects per-stage wall time, CPU time, peak traced memory and item counts.
+
+    Parameters:
+        trace_memory (bool): Track peak Python/numpy allocations with tracemalloc.
+            Tracing is only active inside a stage, but it slows allocation-heavy Python
+            code there (notably depression filling), so it can be turned off to
+            keep only the timers.
+        hook (callable or None): Called with every StageRecord as it is recorded.
+    """
+
+    def __init__(self, trace_memory=True, hook=None):
+        self.trace_memory = trace_memory
+        self.hook = hook
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, items=0):
+        """
+        Times the enclosed block as one run of stage `name` that processed `items` items.
+
+        Yields a counter whose `items` can be set inside the block when the count is only
+        known afterwards.
+        """
+        started = self.trace_memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        counter = SimpleNamespace(items=items)
+        try:
+            yield counter
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            peak = tracemalloc.get_traced_memory()[1] - base if self.trace_memory else 0
+            if started:  # Leave tracing as we found it; it slows every allocation.
+                tracemalloc.stop()
+            self.add(StageRecord(name, wall, cpu, peak, counter.items))
+
+    def add(self, record):
+        self.records.append(record)
+        if self.hook is not None:
+            self.hook(record)
+
+    def child(self):
+        """Empty instrumentation with the same settings and no hook, for a worker process."""
+        return Instrumentation(self.trace_memory)
+
+    def merge(self, records):
+        """Adds records collected by a child (e.g. in a worker process), calling the hook for each."""
+        for record in records or ():
+            self.add(record)
+
+    def clear(self):
+        self.records = []
+
+    def report(self):
+        """
+        Per-stage totals in first-run order.
+
+        Returns:
+            list: One dict per stage with the number of runs, summed wall/CPU seconds and
+                items, and the largest peak allocation of any run.
+        """
+        stages = {}
+        for record in self.records:
+            entry = stages.setdefault(record.name, {"stage": record.name, "runs": 0, "wall": 0.0, "cpu": 0.0,
+                                                    "peak_bytes": 0, "items": 0})
+            entry["runs"] += 1
+            entry["wall"] += record.wall
+            entry["cpu"] += record.cpu
+            entry["peak_bytes"] = max(entry["peak_bytes"], record.peak_bytes)
+            entry["items"] += record.items
+        return list(stages.values())
+
+    def format_report(self):
+        """The report as a fixed-width text table."""
+        lines = [f"{'stage':<22}{'runs':>6}{'wall s':>10}{'cpu s':>10}{'peak MB':>10}{'items':>14}"]
+        for entry in self.report():
+            lines.append(f"{entry['stage']:<22}{entry['runs']:>6}{entry['wall']:>10.3f}{entry['cpu']:>10.3f}"
+                         f"{entry['peak_bytes'] / 2**20:>10.1f}{entry['items']:>14,}")
+        return "\n".join(lines)
+
+def measure(instrument, name, items=0):
+    """instrument.stage(name, items), or a shared no-op context when instrument is None."""
+    if instrument is None:
+        return _DISABLED
+    return instrument.stage(name, items)
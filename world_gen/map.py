@@ -1,87 +1,370 @@
 # map.py
+import tempfile
+
 import numpy as np
-from .terrain import generate_elevation, generate_temperature, generate_moisture, adjust_moisture_for_rivers
-from .biomes import biome_data, Biome, determine_special_features, determine_livestock, generate_resource_map_ca
-from .rivers import generate_multiple_rivers
+from .terrain import (NoiseCache, RIVER_INFLUENCE_RADIUS, generate_plate_map, generate_noise_map, plate_bias,
+                      combine_plates_and_noise, generate_temperature, generate_moisture, river_moisture_boost,
+                      fill_depressions)
+from .biomes import (BiomeGrid, classify_biomes, sample_livestock, sample_special_features, generate_resource_grid,
+                     resource_grid_to_dict)
+from .rivers import generate_multiple_rivers, compute_flow_directions, compute_flow_accumulation
+from .chunks import TileRandom, iter_chunks, map_chunks, open_layer, stage_seed
+from .pipeline import Pipeline, Stage
+from .instrument import measure
+from .preview import PREVIEW_STRIDES, PreviewLevel, refine_layers
+
+# BiomeGrid attributes and dtypes, in constructor order.
+BIOME_LAYERS = (("ids", np.uint8), ("temperature", np.float32), ("humidity", np.float32),
+                ("fertility", np.float32), ("elevation", np.float32), ("livestock", np.uint16),
+                ("special_features", np.uint16))
+
+# Chunk workers take an Instrumentation (or None) and return their records with the result,
+# so stages timed in a worker process are reported by the parent.
+
+def _base_chunk(map_size, noise_backend, noise_cache, plate_engine, plate_seed, noise_seed, rows, cols,
+                instrument=None):
+    """Elevation, temperature and base moisture of one chunk (rows/cols None for the whole map)."""
+    tiles = map_size * map_size if rows is None else len(rows) * len(cols)
+    with measure(instrument, "plates", tiles):
+        plates = generate_plate_map(map_size, plate_engine, plate_seed, rows, cols)
+    with measure(instrument, "noise", tiles):
+        noise_map = generate_noise_map(map_size, noise_backend, noise_cache, rows=rows, cols=cols, seed=noise_seed)
+    with measure(instrument, "combine", tiles):
+        elevation = combine_plates_and_noise(plates, noise_map, plate_bias(plates, plate_seed))
+    with measure(instrument, "temperature", tiles):
+        temperature = generate_temperature(map_size, elevation, rows)
+    with measure(instrument, "moisture", tiles):
+        moisture = generate_moisture(map_size, elevation, temperature, noise_backend, noise_cache, rows, cols,
+                                     noise_seed)
+    return (elevation, temperature, moisture), instrument and instrument.records
+
+def _biome_chunk(elevation, moisture, temperature, livestock_seed, features_seed, instrument=None):
+    """Classified biomes of one chunk with livestock and special features sampled."""
+    with measure(instrument, "biome classification", elevation.size):
+        part = classify_biomes(elevation, moisture, temperature)
+    with measure(instrument, "livestock/features", elevation.size):
+        part.livestock = sample_livestock(part.ids, livestock_seed)
+        part.special_features = sample_special_features(part.ids, features_seed)
+    return part, instrument and instrument.records
+
+def _resource_chunk(biome_ids, iterations, rng, instrument=None):
+    """Resource automaton over one chunk's halo window."""
+    with measure(instrument, "resource CA", biome_ids.size * iterations):
+        grid = generate_resource_grid(biome_ids, iterations, rng)
+    return grid, instrument and instrument.records
 
 class MapGenerator:
-    def __init__(self, map_size):
+    """
+    Generates every layer of a square world map.
+
+    With chunk_size set, layers are generated chunk_size x chunk_size blocks at a time
+    and written into memory-mapped .npy files in storage_dir. Noise and plates are
+    evaluated at map coordinates and need no overlap; river moisture diffusion and the
+    resource automaton read a halo around each chunk (the influence radius and the
+    iteration count) so chunk seams match a whole-map pass.
+
+    Chunking bounds working memory by a few chunks only for these per-tile stages
+    (base maps, biomes, flow directions, river moisture, resources), and only if
+    noise_cache_bytes is small, since the noise cache keeps whole-map octave fields.
+    Depression filling and flow accumulation follow water across the whole map: they
+    write into the memmapped layers but still hold whole-map scratch data in memory, a
+    byte per tile plus the flood heap for filling and two int32 arrays per tile for
+    accumulation. River tracing reads the memmapped directions tile by tile. For
+    worlds whose scratch data does not fit, use world_gen.stream.ChunkProvider, whose
+    rivers are computed per chunk.
+
+    With a seed, every random stage (plates, noise permutation, livestock, features,
+    river starts, resources) draws from its own stream derived from the seed, and
+    chunked stages from one stream per chunk, so the map is reproducible. Chunks can
+    then be generated by a pool of `workers` processes with the same result as a
+    single process.
+
+    generate_all runs the stages as a dependency graph (MAP_PIPELINE) and only re-runs
+    the stages whose parameters or inputs changed since the last call. Seeded stage
+    outputs are also looked up in and stored to the optional MapCache, so regenerating
+    a world with the same parameters loads its layers from disk instead.
+
+    Passing an Instrumentation records wall time, CPU time, peak allocations and item
+    counts of every stage (per chunk); report() summarises them. Without one, stages
+    run behind a shared no-op context.
+    """
+
+    def __init__(self, map_size, noise_backend="numpy", noise_cache_bytes=512 * 2**20, plate_engine="voronoi",
+                 chunk_size=None, storage_dir=None, seed=None, workers=None, cache=None, instrumentation=None):
+        if chunk_size is not None and plate_engine == "scan":
+            raise ValueError("The scan plate engine labels the whole map at once and cannot be chunked.")
+        if workers not in (None, 1) and chunk_size is None:
+            raise ValueError("Parallel generation needs a chunk_size to split the map into.")
         self.map_size = map_size
+        self.noise_backend = noise_backend  # "numpy" (default) or the reference "noise" package
+        self.plate_engine = plate_engine  # "voronoi" (default) or the sequential "scan"
+        self.noise_cache = NoiseCache(noise_cache_bytes)  # Octave fields shared across layers and reruns
+        self.chunk_size = chunk_size  # None keeps every layer in memory
+        self.storage_dir = storage_dir  # Where chunked layers are memory-mapped; a temp dir if None
+        self.seed = seed  # None draws fresh entropy for every stage
+        self.workers = workers  # Processes generating chunks; None runs in this process
+        self.cache = cache  # MapCache for seeded generate_all runs
+        self.instrumentation = instrumentation  # Instrumentation collecting per-stage measurements, or None
+        self.stage_fingerprints = {}  # Fingerprint of every pipeline stage whose outputs are current
         self.elevation_map = None
         self.temperature_map = None
+        self.base_moisture_map = None  # Moisture before rivers, which biomes are classified on
         self.moisture_map = None
-        self.biome_map = None
+        self.biome_grid = None
         self.river_map = None
+        self.river_lengths = None  # Tiles walked by each river, in generation order
         self.resource_map = None
+        self.filled_elevation_map = None  # Depression-filled elevation, computed on demand
+        self.flow_directions = None  # D8 directions of the filled elevation map, computed on demand
+        self.flow_accumulation = None
+
+    def _layer(self, name, dtype):
+        """Allocates a zeroed map layer: in memory, or as a memmapped <name>.npy in chunked mode."""
+        shape = (self.map_size, self.map_size)
+        if self.chunk_size is None:
+            return np.zeros(shape, dtype=dtype)
+        if self.storage_dir is None:
+            self.storage_dir = tempfile.mkdtemp(prefix="world_gen_")
+        return open_layer(self.storage_dir, name, shape, dtype)
+
+    def _chunks(self, halo=0):
+        """Chunks covering the map; a single chunk when chunking is off."""
+        return list(iter_chunks((self.map_size, self.map_size), self.chunk_size or self.map_size, halo))
+
+    def _seed(self, stage, chunk=None):
+        """SeedSequence of a stage (and chunk) derived from self.seed; None when unseeded."""
+        if self.seed is None:
+            return None
+        return stage_seed(self.seed, stage, chunk)
+
+    def _stage_int(self, stage):
+        """Integer seed for hash-based stages (plates, noise, resources)."""
+        return int(np.random.default_rng(self._seed(stage)).integers(2**31))
+
+    def _child_instrument(self):
+        """Fresh instrumentation for one chunk task (None when instrumentation is off)."""
+        return self.instrumentation and self.instrumentation.child()
+
+    def _collect(self, results):
+        """Strips the records off chunk-worker results, merging them into self.instrumentation."""
+        for result, records in results:
+            if self.instrumentation is not None:
+                self.instrumentation.merge(records)
+            yield result
+
+    def _invalidate(self, stage):
+        """Forgets the fingerprints of a stage and everything downstream of it."""
+        for name in MAP_PIPELINE.downstream(stage):
+            self.stage_fingerprints.pop(name, None)
 
     def generate_base_maps(self):
         """Generate elevation, temperature, and initial moisture maps."""
-        self.elevation_map = generate_elevation(self.map_size)
-        self.temperature_map = generate_temperature(self.map_size, self.elevation_map)
-        self.moisture_map = generate_moisture(self.map_size, self.elevation_map, self.temperature_map)
+        self._invalidate("base")
+        self.filled_elevation_map = None
+        self.flow_directions = None
+        self.flow_accumulation = None
+        self.elevation_map = self._layer("elevation", float)
+        self.temperature_map = self._layer("temperature", float)
+        self.base_moisture_map = self.moisture_map = self._layer("base_moisture", float)
+
+        plate_seed = self._stage_int("plates")  # Shared by all chunks so plates line up
+        noise_seed = None if self.seed is None else self._stage_int("noise")
+        cache = self.noise_cache if self.workers in (None, 1) else None  # Workers can't share the cache
+        chunks = self._chunks()
+        tasks = ((self.map_size, self.noise_backend, cache, self.plate_engine, plate_seed, noise_seed,
+                  *(chunk.coords if self.chunk_size else (None, None)), self._child_instrument())
+                 for chunk in chunks)
+        for chunk, layers in zip(chunks, self._collect(map_chunks(_base_chunk, tasks, self.workers))):
+            block = chunk.rows, chunk.cols
+            self.elevation_map[block], self.temperature_map[block], self.base_moisture_map[block] = layers
 
     def generate_biome_map(self):
-        if self.elevation_map is None or self.temperature_map is None or self.moisture_map is None:
+        if self.elevation_map is None or self.temperature_map is None or self.base_moisture_map is None:
             raise ValueError("Base maps must be generated before biome map.")
 
-        self.biome_map = np.empty((self.map_size, self.map_size), dtype=object)
-        for i in range(self.map_size):
-            for j in range(self.map_size):
-                elev = self.elevation_map[i, j]
-                moist = self.moisture_map[i, j]
-                temp = self.temperature_map[i, j]
-
-                if elev < -0.05:
-                    biome_name = "Ocean"
-                elif -0.2 <= elev <= 0.2 and moist > 0.4:
-                    biome_name = "Coast"
-                elif elev > 0.7:
-                    biome_name = "Mountain"
-                elif moist > 0.6 and temp > 0.6:
-                    biome_name = "Rainforest"
-                elif moist < 0.4 and temp > 0.5:
-                    biome_name = "Desert"
-                elif temp < 0.3:
-                    biome_name = "Tundra"
-                else:
-                    biome_name = "Plains"
-
-                biome_info = biome_data[biome_name]
-                self.biome_map[i, j] = Biome(
-                    name=biome_name,
-                    terrain_type=biome_info["terrain"],
-                    temperature=temp * 40 - 10,
-                    humidity=moist,
-                    fertility=np.clip(moist * (1 - abs(temp * 40 - 10) / 40), 0.1, 1.0),
-                    climate_zone=biome_info["climate_zone"],
-                    elevation=(elev + 1) * 1000,
-                    livestock=determine_livestock(biome_name),
-                    special_features=determine_special_features(biome_name),
-                    supply=biome_info["supply"],
-                    security=biome_info["security"],
-                    satisfaction=biome_info["satisfaction"]
-                )
+        self._invalidate("biomes")
+        self.biome_grid = BiomeGrid(*(self._layer(f"biome_{name}", dtype) for name, dtype in BIOME_LAYERS))
+        chunks = self._chunks()
+        tasks = ((self.elevation_map[chunk.rows, chunk.cols], self.base_moisture_map[chunk.rows, chunk.cols],
+                  self.temperature_map[chunk.rows, chunk.cols],
+                  self._seed("livestock", chunk), self._seed("features", chunk), self._child_instrument())
+                 for chunk in chunks)
+        for chunk, part in zip(chunks, self._collect(map_chunks(_biome_chunk, tasks, self.workers))):
+            block = chunk.rows, chunk.cols
+            for name, _ in BIOME_LAYERS:
+                getattr(self.biome_grid, name)[block] = getattr(part, name)
 
     def generate_river_map(self, num_rivers=10, min_elev_start=0.3):
-        if self.elevation_map is None or self.biome_map is None:
+        if self.elevation_map is None or self.biome_grid is None:
             raise ValueError("Elevation and biome maps must be generated before river map.")
-        
-        self.river_map = np.zeros((self.map_size, self.map_size), dtype=bool)
-        generate_multiple_rivers(self.elevation_map, self.river_map, self.biome_map, num_rivers, min_elev_start)
-        # Adjust moisture after rivers are generated
-        self.moisture_map = adjust_moisture_for_rivers(self.moisture_map, self.river_map)
+
+        self._invalidate("rivers")
+        self.river_map = self._layer("rivers", bool)
+        with measure(self.instrumentation, "flow routing", self.elevation_map.size):
+            flow_dir = self.get_flow_directions()
+        with measure(self.instrumentation, "rivers") as stage:
+            paths = generate_multiple_rivers(self.elevation_map, self.river_map, self.biome_grid, num_rivers,
+                                             min_elev_start, flow_dir=flow_dir, rng=self._seed("rivers"))
+            self.river_lengths = np.array([len(path) for path in paths], dtype=np.int32)
+            stage.items = int(self.river_lengths.sum())
+        # Adjust moisture after rivers are generated, keeping the base moisture for reruns
+        self.moisture_map = self._layer("moisture", float)
+        for chunk in self._chunks(halo=RIVER_INFLUENCE_RADIUS):
+            block = chunk.rows, chunk.cols
+            with measure(self.instrumentation, "moisture adjustment", self.moisture_map[block].size):
+                boost = river_moisture_boost(self.river_map[chunk.halo_rows, chunk.halo_cols])[chunk.inner]
+                self.moisture_map[block] = np.clip(self.base_moisture_map[block] + boost, 0, 1)
 
     def generate_resource_map(self, iterations=3):
-        if self.biome_map is None:
+        if self.biome_grid is None:
             raise ValueError("Biome map must be generated before resource map.")
-        
-        self.resource_map = generate_resource_map_ca(self.biome_map, self.map_size, iterations)
+
+        self._invalidate("resources")
+        self.resource_map = self._layer("resources", np.uint8)
+        # Chunks draw from tile-addressed randomness so halo tiles replay their neighbours' draws.
+        seed = self._stage_int("resources")
+        chunks = self._chunks(halo=iterations)
+        tasks = ((self.biome_grid.ids[chunk.halo_rows, chunk.halo_cols], iterations,
+                  TileRandom(seed, chunk.halo_rows.start, chunk.halo_cols.start) if self.chunk_size
+                  else self._seed("resources"), self._child_instrument()) for chunk in chunks)
+        for chunk, grid in zip(chunks, self._collect(map_chunks(_resource_chunk, tasks, self.workers))):
+            self.resource_map[chunk.rows, chunk.cols] = grid[chunk.inner]
+
+    def preview(self, strides=PREVIEW_STRIDES, num_rivers=10, min_elev_start=0.3):
+        """
+        Generates the world coarse-to-fine, yielding a PreviewLevel per stride.
+
+        The first level (every 8th tile by default) arrives after a fraction of the work
+        of a full map. Each following level reuses the previous level's samples and only
+        evaluates the new ones, and every level is an exact subsample of the full map:
+        with a seed, the stride-1 level's base maps equal generate_base_maps output.
+        Biomes, rivers and river moisture are recomputed per level at its resolution.
+        The generator's own layers are left untouched. Needs the Voronoi plate engine.
+
+        Parameters:
+            strides (tuple): Decreasing strides, each a multiple of the next.
+            num_rivers (int): Rivers traced on every level.
+            min_elev_start (float): Minimum elevation of a river source.
+
+        Yields:
+            PreviewLevel: Maps sampled every `stride` tiles.
+        """
+        plate_seed = self._stage_int("plates")
+        noise_seed = None if self.seed is None else self._stage_int("noise")
+
+        def evaluate(rows, cols):
+            return _base_chunk(self.map_size, self.noise_backend, self.noise_cache, self.plate_engine, plate_seed,
+                               noise_seed, rows, cols, self.instrumentation)[0]
+
+        layers, previous = None, None
+        for stride in strides:
+            layers = refine_layers(layers, previous, stride, self.map_size, evaluate)
+            previous = stride
+            yield self._preview_level(stride, *layers, num_rivers, min_elev_start)
+
+    def _preview_level(self, stride, elevation, temperature, moisture, num_rivers, min_elev_start):
+        """Biomes and rivers on top of one level of preview base maps."""
+        biome_grid = classify_biomes(elevation, moisture, temperature)
+        biome_grid.livestock = sample_livestock(biome_grid.ids, self._seed("livestock"))
+        biome_grid.special_features = sample_special_features(biome_grid.ids, self._seed("features"))
+        river_map = np.zeros(elevation.shape, dtype=bool)
+        generate_multiple_rivers(elevation, river_map, biome_grid, num_rivers, min_elev_start,
+                                 flow_dir=compute_flow_directions(fill_depressions(elevation)),
+                                 rng=self._seed("rivers"))
+        boost = river_moisture_boost(river_map, max(1, RIVER_INFLUENCE_RADIUS // stride))
+        return PreviewLevel(stride, elevation, temperature, np.clip(moisture + boost, 0, 1), biome_grid, river_map)
 
     def generate_all(self, num_rivers=10, min_elev_start=0.3, resource_iterations=3):
-        self.generate_base_maps()
-        self.generate_biome_map()
-        self.generate_river_map(num_rivers, min_elev_start)  # This now adjusts moisture
-        self.generate_resource_map(resource_iterations)
+        """
+        Brings every layer up to date with the given parameters.
+
+        Only stages whose fingerprint changed are run: the first call runs everything,
+        a later call with a different resource_iterations only reruns the resource
+        automaton, and a different num_rivers only reruns the rivers. Calling a
+        generate_* method directly invalidates that stage and its dependents.
+
+        Returns:
+            list: Names of the stages that were run or loaded from the cache.
+        """
+        params = {"num_rivers": num_rivers, "min_elev_start": min_elev_start,
+                  "resource_iterations": resource_iterations}
+        cache = self.cache if self.seed is not None else None  # Unseeded stages are not reproducible
+        return MAP_PIPELINE.run(self, params, self.settings(), self.stage_fingerprints, cache)
+
+    def settings(self):
+        """Generator settings every stage's output depends on."""
+        return {
+            "map_size": self.map_size,
+            "seed": self.seed,
+            "chunk_size": self.chunk_size,  # Chunks have their own livestock and resource streams
+            "noise_backend": self.noise_backend,
+            "plate_engine": self.plate_engine,
+        }
+
+    def report(self):
+        """Per-stage totals from the instrumentation (see Instrumentation.report), or None when off."""
+        if self.instrumentation is None:
+            return None
+        return self.instrumentation.report()
+
+    def invalidate(self, stage="base"):
+        """Marks a stage and its dependents as stale so the next generate_all reruns them."""
+        self._invalidate(stage)
+
+    def layers(self):
+        """{name: array} of every layer (None until generated), as stored by MapCache."""
+        layers = {
+            "elevation": self.elevation_map,
+            "temperature": self.temperature_map,
+            "base_moisture": self.base_moisture_map,
+            "moisture": self.moisture_map,
+            "rivers": self.river_map,
+            "river_lengths": self.river_lengths,
+            "resources": self.resource_map,
+        }
+        for name, _ in BIOME_LAYERS:
+            layers[f"biome_{name}"] = None if self.biome_grid is None else getattr(self.biome_grid, name)
+        return layers
+
+    def restore_layers(self, layers):
+        """Adopts layers in the layers() format (e.g. loaded from a MapCache); absent ones are kept."""
+        if "elevation" in layers:
+            self.filled_elevation_map = None
+            self.flow_directions = None
+            self.flow_accumulation = None
+            self.elevation_map = layers["elevation"]
+        self.temperature_map = layers.get("temperature", self.temperature_map)
+        if "base_moisture" in layers:
+            self.base_moisture_map = self.moisture_map = layers["base_moisture"]
+        self.moisture_map = layers.get("moisture", self.moisture_map)
+        self.river_map = layers.get("rivers", self.river_map)
+        self.river_lengths = layers.get("river_lengths", self.river_lengths)
+        self.resource_map = layers.get("resources", self.resource_map)
+        if all(f"biome_{name}" in layers for name, _ in BIOME_LAYERS):
+            self.biome_grid = BiomeGrid(*(layers[f"biome_{name}"] for name, _ in BIOME_LAYERS))
+
+    def get_filled_elevation_map(self):
+        """Elevation with depressions filled so every land tile drains to the sea or map edge."""
+        if self.filled_elevation_map is None and self.elevation_map is not None:
+            self.filled_elevation_map = self._layer("filled_elevation", float)
+            fill_depressions(self.elevation_map, out=self.filled_elevation_map)
+        return self.filled_elevation_map
+
+    def get_flow_directions(self):
+        """D8 flow directions of the filled elevation map, computed once per elevation map."""
+        if self.flow_directions is None and self.get_filled_elevation_map() is not None:
+            self.flow_directions = self._layer("flow_directions", np.int8)
+            for chunk in self._chunks(halo=1):
+                window = self.filled_elevation_map[chunk.halo_rows, chunk.halo_cols]
+                self.flow_directions[chunk.rows, chunk.cols] = compute_flow_directions(window)[chunk.inner]
+        return self.flow_directions
+
+    def get_flow_accumulation(self):
+        """Upstream tile counts for every tile, computed once per elevation map."""
+        if self.flow_accumulation is None and self.get_flow_directions() is not None:
+            self.flow_accumulation = self._layer("flow_accumulation", np.int64)
+            compute_flow_accumulation(self.flow_directions, out=self.flow_accumulation)
+        return self.flow_accumulation
 
     def get_elevation_map(self):
         return self.elevation_map
@@ -92,11 +375,36 @@ class MapGenerator:
     def get_moisture_map(self):
         return self.moisture_map
 
+    def get_biome_grid(self):
+        return self.biome_grid
+
     def get_biome_map(self):
-        return self.biome_map
+        """Compatibility view: a 2D object array of Biome instances built from the biome grid."""
+        if self.biome_grid is None:
+            return None
+        return self.biome_grid.to_biome_map()
 
     def get_river_map(self):
         return self.river_map
 
-    def get_resource_map(self):
-        return self.resource_map
\ No newline at end of file
+    def get_resource_map(self, as_dict=False):
+        """Returns the uint8 resource-id grid, or the {(i, j): resource name} dict when as_dict is set."""
+        if as_dict and self.resource_map is not None:
+            return resource_grid_to_dict(self.resource_map)
+        return self.resource_map
+
+BIOME_LAYER_NAMES = tuple(f"biome_{name}" for name, _ in BIOME_LAYERS)
+
+# base -> biomes -> rivers, biomes -> resources. Rivers read the biome ids for the
+# Ocean/Coast mask and write the river-adjusted moisture next to the base moisture.
+MAP_PIPELINE = Pipeline([
+    Stage("base", lambda gen, params: gen.generate_base_maps(),
+          inputs=(), outputs=("elevation", "temperature", "base_moisture"), params=()),
+    Stage("biomes", lambda gen, params: gen.generate_biome_map(),
+          inputs=("elevation", "temperature", "base_moisture"), outputs=BIOME_LAYER_NAMES, params=()),
+    Stage("rivers", lambda gen, params: gen.generate_river_map(params["num_rivers"], params["min_elev_start"]),
+          inputs=("elevation", "base_moisture", "biome_ids"), outputs=("rivers", "river_lengths", "moisture"),
+          params=("num_rivers", "min_elev_start")),
+    Stage("resources", lambda gen, params: gen.generate_resource_map(params["resource_iterations"]),
+          inputs=("biome_ids",), outputs=("resources",), params=("resource_iterations",)),
+])
\ No newline at end of file
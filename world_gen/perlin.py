@@ -0,0 +1,187 @@
+# perlin.py
+from functools import lru_cache
+
+import numpy as np
+
+# Ken Perlin's reference permutation. This is the same table the `noise` package
+# uses, so the default (unseeded) fields match `noise.pnoise2` up to float rounding.
+_PERLIN_PERMUTATION = np.array([
+    151, 160, 137, 91, 90, 15, 131, 13, 201, 95, 96, 53, 194, 233, 7, 225, 140,
+    36, 103, 30, 69, 142, 8, 99, 37, 240, 21, 10, 23, 190, 6, 148, 247, 120,
+    234, 75, 0, 26, 197, 62, 94, 252, 219, 203, 117, 35, 11, 32, 57, 177, 33,
+    88, 237, 149, 56, 87, 174, 20, 125, 136, 171, 168, 68, 175, 74, 165, 71,
+    134, 139, 48, 27, 166, 77, 146, 158, 231, 83, 111, 229, 122, 60, 211, 133,
+    230, 220, 105, 92, 41, 55, 46, 245, 40, 244, 102, 143, 54, 65, 25, 63, 161,
+    1, 216, 80, 73, 209, 76, 132, 187, 208, 89, 18, 169, 200, 196, 135, 130,
+    116, 188, 159, 86, 164, 100, 109, 198, 173, 186, 3, 64, 52, 217, 226, 250,
+    124, 123, 5, 202, 38, 147, 118, 126, 255, 82, 85, 212, 207, 206, 59, 227,
+    47, 16, 58, 17, 182, 189, 28, 42, 223, 183, 170, 213, 119, 248, 152, 2, 44,
+    154, 163, 70, 221, 153, 101, 155, 167, 43, 172, 9, 129, 22, 39, 253, 19, 98,
+    108, 110, 79, 113, 224, 232, 178, 185, 112, 104, 218, 246, 97, 228, 251, 34,
+    242, 193, 238, 210, 144, 12, 191, 179, 162, 241, 81, 51, 145, 235, 249, 14,
+    239, 107, 49, 192, 214, 31, 181, 199, 106, 157, 184, 84, 204, 176, 115, 121,
+    50, 45, 127, 4, 150, 254, 138, 236, 205, 93, 222, 114, 67, 29, 24, 72, 243,
+    141, 128, 195, 78, 66, 215, 61, 156, 180,
+], dtype=np.int16)
+
+# 2-D gradient directions (the x/y columns of the `noise` package's GRAD3 table).
+_GRAD_X = np.array([1, -1, 1, -1, 1, -1, 1, -1, 0, 0, 0, 0, 1, -1, 0, 0], dtype=float)
+_GRAD_Y = np.array([1, 1, -1, -1, 0, 0, 0, 0, 1, -1, 1, -1, 0, 0, -1, 1], dtype=float)
+
+
+@lru_cache(maxsize=32)
+def permutation_table(seed=None):
+    """
+    Returns the doubled (512 entry) permutation table used for lattice hashing.
+
+    Parameters:
+        seed (int or None): None gives Ken Perlin's reference table; any other value
+            gives a reproducible shuffle of 0..255.
+
+    Returns:
+        np.array: Read-only int16 array of length 512.
+    """
+    if seed is None:
+        perm = _PERLIN_PERMUTATION
+    else:
+        perm = np.random.default_rng(seed).permutation(256).astype(np.int16)
+    table = np.concatenate([perm, perm])
+    table.flags.writeable = False
+    return table
+
+
+def _fade(t):
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+
+def _grad(hashes, dx, dy):
+    h = hashes & 15
+    return _GRAD_X[h] * dx[:, None] + _GRAD_Y[h] * dy[None, :]
+
+
+def perlin_octave(rows, cols, frequency, repeat=1024.0, seed=None):
+    """
+    Evaluates a single octave of improved Perlin noise over a whole grid.
+
+    The sample at (r, c) is the noise value at (rows[r] * frequency, cols[c] * frequency),
+    i.e. the same point `noise.pnoise2(i * frequency, j * frequency, octaves=1)` samples.
+
+    Parameters:
+        rows (array-like): 1D tile coordinates along the first axis.
+        cols (array-like): 1D tile coordinates along the second axis.
+        frequency (float): Scale applied to tile coordinates.
+        repeat (float): Period of the noise in lattice units.
+        seed (int or None): Permutation seed (see permutation_table).
+
+    Returns:
+        np.array: 2D float array of shape (len(rows), len(cols)).
+    """
+    perm = permutation_table(seed)
+    x = np.asarray(rows, dtype=float) * frequency
+    y = np.asarray(cols, dtype=float) * frequency
+
+    # Lattice corners, wrapped by the repeat period like the reference implementation.
+    xi = np.floor(np.fmod(x, repeat)).astype(np.int64)
+    yi = np.floor(np.fmod(y, repeat)).astype(np.int64)
+    xii = np.fmod(xi + 1, repeat).astype(np.int64) & 255
+    yii = np.fmod(yi + 1, repeat).astype(np.int64) & 255
+    xi &= 255
+    yi &= 255
+
+    xf = x - np.floor(x)
+    yf = y - np.floor(y)
+    fx = _fade(xf)[:, None]
+    fy = _fade(yf)[None, :]
+
+    # Hash lookups: the first level only depends on the row, the second needs the full grid.
+    a = perm[xi][:, None]
+    b = perm[xii][:, None]
+    aa = perm[perm[a + yi[None, :]]]
+    ab = perm[perm[a + yii[None, :]]]
+    ba = perm[perm[b + yi[None, :]]]
+    bb = perm[perm[b + yii[None, :]]]
+
+    bottom = _grad(aa, xf, yf)
+    bottom += fx * (_grad(ba, xf - 1, yf) - bottom)
+    top = _grad(ab, xf, yf - 1)
+    top += fx * (_grad(bb, xf - 1, yf - 1) - top)
+    bottom += fy * (top - bottom)
+    return bottom
+
+
+def fractal_noise(rows, cols, frequency, octaves=1, persistence=0.5, lacunarity=2.0,
+                  repeat=1024.0, seed=None):
+    """
+    Evaluates fractal (fBm) Perlin noise over a whole grid in one batched call.
+
+    Mirrors `noise.pnoise2`: each octave multiplies the frequency by `lacunarity` and the
+    amplitude by `persistence`, and the sum is normalised by the total amplitude.
+
+    Parameters:
+        rows (array-like): 1D tile coordinates along the first axis.
+        cols (array-like): 1D tile coordinates along the second axis.
+        frequency (float): Scale applied to tile coordinates for the first octave.
+        octaves (int): Number of octaves to sum.
+        persistence (float): Amplitude multiplier between octaves.
+        lacunarity (float): Frequency multiplier between octaves.
+        repeat (float): Period of the first octave in lattice units.
+        seed (int or None): Permutation seed (see permutation_table).
+
+    Returns:
+        np.array: 2D float array of shape (len(rows), len(cols)).
+    """
+    if octaves < 1:
+        raise ValueError("Expected octaves value > 0")
+
+    total = None
+    amp = 1.0
+    max_amp = 0.0
+    for octave in range(octaves):
+        scale = lacunarity ** octave
+        layer = perlin_octave(rows, cols, frequency * scale, repeat * scale, seed)
+        if total is None:
+            total = layer
+        else:
+            total += layer * amp
+        max_amp += amp
+        amp *= persistence
+    return total / max_amp
+
+
+_SPLITMIX_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_SPLITMIX_MUL1 = np.uint64(0xBF58476D1CE4E5B9)
+_SPLITMIX_MUL2 = np.uint64(0x94D049BB133111EB)
+
+
+def _splitmix64(x):
+    x = x + _SPLITMIX_GAMMA
+    x = (x ^ (x >> np.uint64(30))) * _SPLITMIX_MUL1
+    x = (x ^ (x >> np.uint64(27))) * _SPLITMIX_MUL2
+    return x ^ (x >> np.uint64(31))
+
+
+def lattice_hash(seed, *coords):
+    """
+    Hashes integer lattice coordinates into well-mixed 64-bit values.
+
+    The result only depends on the seed and the coordinates themselves, so any window
+    of a lattice can be hashed independently and still agree with its neighbours.
+
+    Parameters:
+        seed (int): Seed mixed into every hash.
+        *coords (array-like): Integer coordinate arrays, broadcast against each other.
+
+    Returns:
+        np.array: uint64 array with the broadcast shape of the coordinates.
+    """
+    coords = np.broadcast_arrays(*[np.asarray(c, dtype=np.int64) for c in coords])
+    with np.errstate(over="ignore"):
+        h = np.full(coords[0].shape, np.uint64(seed % 2**64))
+        for c in coords:
+            h = _splitmix64(h ^ c.astype(np.uint64))
+    return h
+
+
+def lattice_uniform(seed, *coords):
+    """Uniform floats in [0, 1) addressed by integer lattice coordinates (see lattice_hash)."""
+    return (lattice_hash(seed, *coords) >> np.uint64(11)).astype(float) * (1.0 / 2**53)
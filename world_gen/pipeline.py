@@ -0,0 +1,114 @@
+# pipeline.py
+from collections import namedtuple
+
+from .cache import MapCache
+
+class Stage(namedtuple("Stage", ["name", "run", "inputs", "outputs", "params"])):
+    """
+    One step of a generation pipeline.
+
+    Attributes:
+        name (str): Stage name.
+        run (callable): run(target, params) computes the stage's outputs on target.
+        inputs (tuple): Names of the layers the stage reads.
+        outputs (tuple): Names of the layers the stage writes.
+        params (tuple): Names of the pipeline parameters the stage depends on.
+    """
+
+class Pipeline:
+    """
+    Dependency graph of stages, connected through the layers they read and write.
+
+    Every stage has a fingerprint hashing its own parameters, the target's settings and
+    the fingerprints of the stages producing its inputs, so changing a parameter changes
+    the fingerprint of exactly the stages it can affect. run() re-runs only those.
+
+    The target (a MapGenerator) provides the layers as layers() / restore_layers(),
+    which is what lets stage outputs be stored to and restored from a MapCache keyed by
+    the fingerprint.
+    """
+
+    def __init__(self, stages):
+        producers = {}
+        for stage in stages:
+            for layer in stage.outputs:
+                if layer in producers:
+                    raise ValueError(f"Layer '{layer}' is written by both '{producers[layer]}' and '{stage.name}'.")
+                producers[layer] = stage.name
+
+        self.stages = {stage.name: stage for stage in stages}
+        self.upstream = {}
+        for stage in stages:
+            missing = [layer for layer in stage.inputs if layer not in producers]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' reads layers no stage writes: {missing}.")
+            self.upstream[stage.name] = sorted({producers[layer] for layer in stage.inputs})
+
+        # Topological order (stages whose inputs are all produced come first).
+        self.order = []
+        remaining = dict(self.upstream)
+        while remaining:
+            ready = [name for name, deps in remaining.items() if all(dep in self.order for dep in deps)]
+            if not ready:
+                raise ValueError(f"Stages {sorted(remaining)} form a cycle.")
+            for name in ready:
+                self.order.append(name)
+                del remaining[name]
+
+    def downstream(self, name):
+        """The stage and every stage that (transitively) reads its outputs, in run order."""
+        affected = {name}
+        for stage in self.order:
+            if any(dep in affected for dep in self.upstream[stage]):
+                affected.add(stage)
+        return [stage for stage in self.order if stage in affected]
+
+    def fingerprints(self, params, settings=None):
+        """{stage name: hex fingerprint} for the given pipeline parameters and target settings."""
+        fingerprints = {}
+        for name in self.order:
+            stage = self.stages[name]
+            fingerprints[name] = MapCache.key({
+                "stage": name,
+                "settings": settings,
+                "params": {param: params[param] for param in stage.params},
+                "upstream": [fingerprints[dep] for dep in self.upstream[name]],
+            })
+        return fingerprints
+
+    def run(self, target, params, settings=None, done=None, cache=None):
+        """
+        Brings target up to date with params.
+
+        Parameters:
+            target: Object the stages run on (see class docstring).
+            params (dict): Value of every pipeline parameter.
+            settings (dict): Target-wide settings every stage depends on.
+            done (dict): {stage name: fingerprint} of the stage outputs target already
+                holds; updated in place.
+            cache (MapCache or None): Stage outputs are loaded from / stored to it.
+
+        Returns:
+            list: Names of the stages that were run or loaded, in run order.
+        """
+        done = {} if done is None else done
+        fingerprints = self.fingerprints(params, settings)
+        updated = []
+        for name in self.order:
+            fingerprint = fingerprints[name]
+            if done.get(name) == fingerprint:
+                continue
+            stage = self.stages[name]
+            layers = cache.load(fingerprint) if cache is not None else None
+            if layers is not None:
+                target.restore_layers(layers)
+            else:
+                stage.run(target, params)
+                if cache is not None:
+                    produced = target.layers()
+                    cache.store(fingerprint, {layer: produced[layer] for layer in stage.outputs},
+                                {"stage": name, "settings": settings,
+                                 "params": {param: params[param] for param in stage.params}})
+            done[name] = fingerprint
+            updated.append(name)
+        return updated
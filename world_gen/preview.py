@@ -0,0 +1,49 @@
+# preview.py
+from collections import namedtuple
+
+import numpy as np
+
+# Default level-of-detail pyramid: every 8th tile, then 4th, 2nd and every tile.
+PREVIEW_STRIDES = (8, 4, 2, 1)
+
+# One preview level: maps sampled every `stride` tiles (tile (i, j) is map tile (i * stride, j * stride)).
+PreviewLevel = namedtuple("PreviewLevel", ["stride", "elevation", "temperature", "moisture", "biome_grid",
+                                           "river_map"])
+
+def refine_layers(coarse_layers, coarse_stride, stride, map_size, evaluate):
+    """
+    Resamples layers from every coarse_stride-th tile to every stride-th tile.
+
+    Samples already present at the coarse level are copied over, so plate ids and noise
+    octaves are only evaluated for the new rows and columns (three quarters of the
+    samples when halving the stride). The layers must be point-wise functions of map
+    coordinates, which makes every level an exact subsample of the full-resolution map.
+
+    Parameters:
+        coarse_layers (tuple or None): Arrays sampled every coarse_stride tiles, or None
+            to evaluate the first level from scratch.
+        coarse_stride (int or None): Stride of coarse_layers; a multiple of stride.
+        stride (int): Stride of the result.
+        map_size (int): The size of the map (assuming square).
+        evaluate (callable): evaluate(rows, cols) -> tuple of arrays over that window.
+
+    Returns:
+        tuple: The layers sampled every stride tiles.
+    """
+    coords = np.arange(0, map_size, stride)
+    if coarse_layers is None:
+        return tuple(evaluate(coords, coords))
+    if coarse_stride % stride or coarse_stride == stride:
+        raise ValueError(f"Cannot refine stride {coarse_stride} to {stride}.")
+
+    known = coords % coarse_stride == 0
+    new_rows = evaluate(coords[~known], coords)
+    new_cols = evaluate(coords[known], coords[~known])
+    layers = []
+    for coarse, rows_part, cols_part in zip(coarse_layers, new_rows, new_cols):
+        layer = np.empty((coords.size, coords.size), dtype=rows_part.dtype)
+        layer[np.ix_(known, known)] = coarse
+        layer[~known] = rows_part
+        layer[np.ix_(known, ~known)] = cols_part
+        layers.append(layer)
+    return tuple(layers)
@@ -1,6 +1,11 @@
 # rivers.py
 import numpy as np
 
+from .biomes import as_biome_grid
+
+# D8 neighbour offsets; a flow direction is an index into this tuple, or -1 for a pit.
+D8_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
 def get_neighbors(i, j, size):
     """Return all eight neighboring coordinates within bounds."""
     neighbors = []
@@ -10,10 +15,14 @@ def get_neighbors(i, j, size):
             neighbors.append((ni, nj))
     return neighbors
 
-def simulate_river(start_i, start_j, elev_map, river_map, biome_map, max_length=150):
+def simulate_river(start_i, start_j, elev_map, river_map, biome_map, max_length=150, water_mask=None):
     """
     Simulate a river starting from (start_i, start_j), flowing to lower elevations.
+
+    water_mask (Ocean/Coast tiles) is derived from biome_map when not given.
     """
+    if water_mask is None:
+        water_mask = as_biome_grid(biome_map).mask("Ocean", "Coast")
     current_i, current_j = start_i, start_j
     river_path = [(current_i, current_j)]
     river_map[current_i, current_j] = True
@@ -31,7 +40,7 @@ def simulate_river(start_i, start_j, elev_map, river_map, biome_map, max_length=
         lowest_neighbor = min(unvisited_neighbors, key=lambda n: elev_map[n[0], n[1]])
         next_i, next_j = lowest_neighbor
 
-        if biome_map[next_i, next_j].name in ["Ocean", "Coast"] or elev_map[next_i, next_j] < -0.05:
+        if water_mask[next_i, next_j] or elev_map[next_i, next_j] < -0.05:
             river_path.append((next_i, next_j))
             river_map[next_i, next_j] = True
             break
@@ -43,27 +52,208 @@ def simulate_river(start_i, start_j, elev_map, river_map, biome_map, max_length=
 
     return river_path
 
-def generate_multiple_rivers(elev_map, river_map, biome_map, num_rivers=20, min_elev_start=0.2):
+def compute_flow_directions(elev_map):
+    """
+    Computes the D8 flow direction of every tile in one vectorized pass.
+
+    Each tile drains to the neighbour with the steepest downhill slope (drop divided by
+    distance, so diagonals count as sqrt(2) away). Tiles with no lower neighbour are pits.
+
+    Parameters:
+        elev_map (np.array): 2D elevation array.
+
+    Returns:
+        np.array: 2D int8 array of indices into D8_OFFSETS, -1 for pits.
+    """
+    rows, cols = elev_map.shape
+    padded = np.pad(elev_map.astype(float), 1, constant_values=np.inf)
+    best_slope = np.zeros((rows, cols))
+    flow_dir = np.full((rows, cols), -1, dtype=np.int8)
+    for direction, (di, dj) in enumerate(D8_OFFSETS):
+        neighbor = padded[1 + di:1 + di + rows, 1 + dj:1 + dj + cols]
+        slope = (elev_map - neighbor) / np.hypot(di, dj)
+        steeper = slope > best_slope
+        best_slope[steeper] = slope[steeper]
+        flow_dir[steeper] = direction
+    return flow_dir
+
+def _index_dtype(size):
+    return np.int32 if size < 2**31 else np.int64
+
+def flow_targets(flow_dir, block_rows=256):
+    """
+    Flat index of the tile each tile drains into (-1 for pits).
+
+    Built block_rows rows at a time into a single int32 array (int64 for maps of 2**31
+    tiles or more), so the only full-size allocation is the result.
+    """
+    rows, cols = flow_dir.shape
+    dtype = _index_dtype(flow_dir.size)
+    # Flat offset of every direction; the extra entry sends pits (-1) to -1 - k below.
+    deltas = np.array([di * cols + dj for di, dj in D8_OFFSETS] + [0], dtype=dtype)
+    targets = np.empty(flow_dir.size, dtype=dtype)
+    for row0 in range(0, rows, block_rows):
+        block = np.asarray(flow_dir[row0:row0 + block_rows]).ravel()
+        start = row0 * cols
+        out = targets[start:start + block.size]
+        out[:] = np.arange(start, start + block.size, dtype=dtype)
+        out += deltas[block]
+        out[block < 0] = -1
+    return targets
+
+class FlowPointers:
+    """
+    flow_targets evaluated on access: pointers[k] is the flat index tile k drains into
+    (-1 for pits). For walks that visit a few tiles (trace_river), so no full-size
+    pointer array is allocated; flow_dir may be a memmap.
+    """
+
+    def __init__(self, flow_dir):
+        cols = flow_dir.shape[1]
+        self.flow = flow_dir.reshape(-1)
+        self.deltas = [di * cols + dj for di, dj in D8_OFFSETS]
+
+    def __getitem__(self, index):
+        direction = self.flow[index]
+        return -1 if direction < 0 else int(index) + self.deltas[direction]
+
+def compute_flow_accumulation(flow_dir, out=None):
+    """
+    Counts, for every tile, how many tiles (itself included) drain through it.
+
+    Tiles are processed in waves from the ridges down: a tile is pushed downstream once
+    every tile draining into it has been, so the number of waves equals the longest flow
+    path and each wave is a handful of array operations. Besides the result this needs
+    two full-size int32 arrays (pointers and pending counts) and a boolean mask.
+
+    Parameters:
+        flow_dir (np.array): D8 directions from compute_flow_directions.
+        out (np.array or None): C-contiguous 2D int64 array (e.g. a memmap) to write the
+            counts into instead of allocating one.
+
+    Returns:
+        np.array: 2D int64 array of upstream tile counts.
+    """
+    targets = flow_targets(flow_dir)
+    drains = targets >= 0
+    pending = np.zeros(targets.size, dtype=targets.dtype)
+    np.add.at(pending, targets[drains], 1)
+    if out is None:
+        out = np.empty(flow_dir.shape, dtype=np.int64)
+    accumulation = out.reshape(-1)
+    accumulation[:] = 1
+
+    wave = np.flatnonzero(pending == 0)
+    while wave.size:
+        wave = wave[drains[wave]]
+        downstream = targets[wave]
+        np.add.at(accumulation, downstream, accumulation[wave])
+        np.subtract.at(pending, downstream, 1)
+        wave = np.unique(downstream[pending[downstream] == 0])
+    return out
+
+def trace_river(start_i, start_j, targets, river_map, stop_mask, max_length=150):
+    """
+    Follows D8 pointers (flow_targets output or a FlowPointers) from (start_i, start_j),
+    marking river tiles.
+
+    The river ends after entering a stop_mask tile (Ocean/Coast), at a pit, after
+    max_length steps, or when it joins an existing river; stopping at confluences means
+    each tile of the drainage network is walked at most once across all rivers.
+
+    Returns:
+        list: The river path as (i, j) coordinates.
+    """
+    cols = river_map.shape[1]
+    index = start_i * cols + start_j
+    river_path = [(start_i, start_j)]
+    river_map[start_i, start_j] = True
+
+    for _ in range(max_length):
+        index = targets[index]
+        if index < 0:
+            break
+        next_i, next_j = divmod(int(index), cols)
+        joined = river_map[next_i, next_j]
+        river_path.append((next_i, next_j))
+        river_map[next_i, next_j] = True
+        if joined or stop_mask[next_i, next_j]:
+            break
+
+    return river_path
+
+def trace_river_network(sources, targets, stop_mask, max_length=150):
+    """
+    Walks every source max_length D8 steps downstream at once and marks the tiles visited.
+
+    Rivers end after entering a stop_mask tile or at a pit, but unlike trace_river they
+    do not stop where they join another river: the result is the union of every
+    source's path and does not depend on the order of the sources, so overlapping
+    windows of a larger map agree on it. Walkers that reach the same tile in the same
+    step have the same future and are merged.
+
+    Parameters:
+        sources (array-like): Flat indices of the river sources.
+        targets (np.array): flow_targets output for the same grid.
+        stop_mask (np.array): 2D boolean array of tiles rivers end in.
+        max_length (int): Maximum number of steps per river.
+
+    Returns:
+        np.array: 2D boolean river map with the shape of stop_mask.
+    """
+    river_map = np.zeros(stop_mask.size, dtype=bool)
+    stop = stop_mask.ravel()
+    current = np.unique(np.asarray(sources, dtype=np.int64))
+    river_map[current] = True
+    for _ in range(max_length):
+        current = targets[current]
+        current = np.unique(current[current >= 0])
+        river_map[current] = True
+        current = current[~stop[current]]
+        if not current.size:
+            break
+    return river_map.reshape(stop_mask.shape)
+
+def rivers_from_accumulation(flow_accumulation, threshold, land_mask=None):
+    """Marks every tile draining at least `threshold` tiles as river (optionally land only)."""
+    river_map = flow_accumulation >= threshold
+    if land_mask is not None:
+        river_map &= land_mask
+    return river_map
+
+def generate_multiple_rivers(elev_map, river_map, biome_map, num_rivers=20, min_elev_start=0.2, flow_dir=None,
+                             rng=None):
     """
     Generate multiple rivers starting from high elevation points.
 
+    Rivers follow D8 flow directions (computed from elev_map unless flow_dir is given),
+    so tributaries merge into the first river they meet instead of re-walking it. Pass
+    directions of a depression-filled surface (terrain.fill_depressions) so rivers
+    reach the sea instead of ending in pits. Start points are drawn from rng
+    (np.random.Generator, int seed or None).
+
     Returns:
         list: List of river paths (each path is a list of (i, j) coordinates).
     """
-    map_size = elev_map.shape[0]
-    potential_starts = [(i, j) for i in range(map_size) for j in range(map_size) 
-                        if elev_map[i, j] > min_elev_start and biome_map[i, j].name not in ["Ocean", "Coast"]]
-    
-    if not potential_starts:
+    water_mask = as_biome_grid(biome_map).mask("Ocean", "Coast")
+    stop_mask = water_mask | (elev_map < -0.05)
+    potential_starts = np.flatnonzero((elev_map > min_elev_start) & ~water_mask)
+
+    if not potential_starts.size:
         return []
 
+    if flow_dir is None:
+        flow_dir = compute_flow_directions(elev_map)
+    targets = FlowPointers(flow_dir)  # Rivers visit few tiles; no full-size pointer array needed.
+
     # Sample more starting points to ensure we get the desired number of rivers
-    start_points = np.random.choice(len(potential_starts), min(num_rivers, len(potential_starts)), replace=False)
+    rng = np.random.default_rng(rng)
+    start_points = rng.choice(len(potential_starts), min(num_rivers, len(potential_starts)), replace=False)
     river_paths = []
-    
+
     for idx in start_points:
-        start_i, start_j = potential_starts[idx]
-        path = simulate_river(start_i, start_j, elev_map, river_map, biome_map)
+        start_i, start_j = divmod(int(potential_starts[idx]), elev_map.shape[1])
+        path = trace_river(start_i, start_j, targets, river_map, stop_mask)
         river_paths.append(path)
 
-    return river_paths
\ No newline at end of file
+    return river_paths
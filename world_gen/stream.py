@@ -0,0 +1,212 @@
+# stream.py
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+from .terrain import (NoiseCache, RIVER_INFLUENCE_RADIUS, SEA_LEVEL, generate_plates_voronoi, generate_noise_map,
+                      plate_bias, combine_plates_and_noise, generate_temperature, generate_moisture,
+                      river_moisture_boost)
+from .biomes import BiomeGrid, classify_biomes, sample_livestock, sample_special_features, generate_resource_grid
+from .rivers import compute_flow_directions, flow_targets, trace_river_network
+from .chunks import TileRandom, stage_seed
+from .cache import MapCache, read_layers, write_layers
+from .perlin import lattice_uniform
+
+# Layers of a streamed chunk; the biome_* layers are the BiomeGrid arrays.
+CHUNK_LAYERS = ("elevation", "temperature", "moisture", "rivers", "resources", "biome_ids", "biome_temperature",
+                "biome_humidity", "biome_fertility", "biome_elevation", "biome_livestock",
+                "biome_special_features")
+
+class ChunkProvider:
+    """
+    Unbounded world generated chunk by chunk on first access.
+
+    Chunk (ci, cj) covers tiles [ci * chunk_size, (ci + 1) * chunk_size) x the same for
+    cj; indices may be negative. Every stage is evaluated from map coordinates and
+    coordinate-hashed randomness (see chunks.TileRandom), and each chunk is computed
+    from a window wide enough to contain everything that can influence it:
+
+    - plates, noise, temperature and biomes are point-wise and need no margin;
+    - a river tile can only come from a source within max_river_length tiles, so
+      sources are picked by hash over that margin and traced with
+      trace_river_network (order-independent, unlike MapGenerator's rivers);
+    - river moisture reads RIVER_INFLUENCE_RADIUS further;
+    - the resource automaton reads resource_iterations tiles.
+
+    Neighbouring chunks therefore match exactly along their seams. Rivers follow the
+    unfilled terrain (depression filling is a whole-map pass) and end in pits.
+
+    Hot chunks stay in an LRU cache bounded by memory_budget bytes; evicted chunks are
+    written to spill_dir and reloaded from there instead of being regenerated.
+
+    Every chunk is generated from a window of chunk_size + 2 * margin tiles a side, with
+    margin = RIVER_INFLUENCE_RADIUS + max_river_length + 1 (156 tiles by default), so
+    each chunk costs (1 + 2 * margin / chunk_size)^2 times its own area (see overhead):
+    2.6x at chunk_size=512, 4.9x at 256 and 34x at 64. Keep chunk_size well above the
+    margin, or lower max_river_length when chunks must be small.
+
+    Parameters:
+        seed (int): World seed.
+        chunk_size (int): Side length of a chunk in tiles; see above for the overhead.
+        memory_budget (int): Bytes of chunk layers kept in memory.
+        spill_dir (str or None): Where evicted chunks go; a temp dir if None. Chunks are
+            stored under a subdirectory keyed by the world settings.
+        latitude_span (int): Rows from pole to pole; temperature bands repeat with
+            this period.
+        river_density (float): Chance that an eligible tile is a river source.
+        min_elev_start (float): Minimum elevation of a river source.
+        max_river_length (int): Maximum steps a river walks.
+        resource_iterations (int): Resource automaton iterations.
+    """
+
+    def __init__(self, seed, chunk_size=512, memory_budget=256 * 2**20, spill_dir=None, latitude_span=512,
+                 river_density=0.002, min_elev_start=0.3, max_river_length=150, resource_iterations=3):
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.memory_budget = memory_budget
+        self.latitude_span = latitude_span
+        self.river_density = river_density
+        self.min_elev_start = min_elev_start
+        self.max_river_length = max_river_length
+        self.resource_iterations = resource_iterations
+        self.noise_cache = NoiseCache(64 * 2**20)
+
+        settings = {"seed": seed, "chunk_size": chunk_size, "latitude_span": latitude_span,
+                    "river_density": river_density, "min_elev_start": min_elev_start,
+                    "max_river_length": max_river_length, "resource_iterations": resource_iterations}
+        root = spill_dir if spill_dir is not None else tempfile.mkdtemp(prefix="world_chunks_")
+        self.spill_dir = os.path.join(root, MapCache.key(settings)[:16])
+        os.makedirs(self.spill_dir, exist_ok=True)
+
+        self._seeds = {stage: int(np.random.default_rng(stage_seed(seed, stage)).integers(2**31))
+                       for stage in ("plates", "noise", "livestock", "features", "rivers", "resources")}
+        self._chunks = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.generated = 0
+        self.reloads = 0
+        self.spills = 0
+
+    def chunk(self, ci, cj):
+        """{layer name: array} of chunk (ci, cj), from memory, the spill directory or generated."""
+        key = (ci, cj)
+        layers = self._chunks.get(key)
+        if layers is not None:
+            self.hits += 1
+            self._chunks.move_to_end(key)
+            return layers
+
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            layers = read_layers(path, mmap_mode=None)
+            self.reloads += 1
+        else:
+            layers = self.generate_chunk(ci, cj)
+            self.generated += 1
+        self._chunks[key] = layers
+        self.nbytes += sum(array.nbytes for array in layers.values())
+        self._evict()
+        return layers
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, f"{key[0]}_{key[1]}")
+
+    def _evict(self):
+        """Spills least recently used chunks until the budget is met (the newest chunk always stays)."""
+        while self.nbytes > self.memory_budget and len(self._chunks) > 1:
+            key, layers = self._chunks.popitem(last=False)
+            self.nbytes -= sum(array.nbytes for array in layers.values())
+            path = self._spill_path(key)
+            if not os.path.exists(path):
+                write_layers(path, layers)
+                self.spills += 1
+
+    def window(self, name, row0, row1, col0, col1):
+        """Assembles layer `name` over tiles [row0, row1) x [col0, col1), touching every chunk it covers."""
+        size = self.chunk_size
+        out = None
+        for ci in range(row0 // size, (row1 - 1) // size + 1):
+            for cj in range(col0 // size, (col1 - 1) // size + 1):
+                layer = self.chunk(ci, cj)[name]
+                if out is None:
+                    out = np.empty((row1 - row0, col1 - col0), dtype=layer.dtype)
+                r0, r1 = max(row0, ci * size), min(row1, (ci + 1) * size)
+                c0, c1 = max(col0, cj * size), min(col1, (cj + 1) * size)
+                out[r0 - row0:r1 - row0, c0 - col0:c1 - col0] = layer[r0 - ci * size:r1 - ci * size,
+                                                                       c0 - cj * size:c1 - cj * size]
+        return out
+
+    def biome_grid(self, row0, row1, col0, col1):
+        """BiomeGrid over tiles [row0, row1) x [col0, col1)."""
+        return BiomeGrid(*(self.window(name, row0, row1, col0, col1) for name in CHUNK_LAYERS[5:]))
+
+    def prefetch(self, row0, row1, col0, col1):
+        """Generates (or reloads) every chunk overlapping the given tile range, e.g. around a viewport."""
+        size = self.chunk_size
+        for ci in range(row0 // size, (row1 - 1) // size + 1):
+            for cj in range(col0 // size, (col1 - 1) // size + 1):
+                self.chunk(ci, cj)
+
+    @property
+    def margin(self):
+        """Tiles read around a chunk: river sources up to max_river_length away, plus the moisture radius."""
+        return max(RIVER_INFLUENCE_RADIUS + self.max_river_length + 1, self.resource_iterations)
+
+    @property
+    def overhead(self):
+        """Tiles generated per tile of a chunk."""
+        return (1 + 2 * self.margin / self.chunk_size) ** 2
+
+    def generate_chunk(self, ci, cj):
+        """Generates chunk (ci, cj) from scratch (see the class docstring for the margins)."""
+        size = self.chunk_size
+        margin = self.margin
+        row0, col0 = ci * size - margin, cj * size - margin
+        rows = np.arange(row0, row0 + size + 2 * margin)
+        cols = np.arange(col0, col0 + size + 2 * margin)
+        inner = (slice(margin, margin + size), slice(margin, margin + size))
+
+        # Point-wise base maps over the whole window.
+        plates = generate_plates_voronoi(None, seed=self._seeds["plates"], rows=rows, cols=cols)
+        noise_map = generate_noise_map(None, cache=self.noise_cache, rows=rows, cols=cols, seed=self._seeds["noise"])
+        elevation = combine_plates_and_noise(plates, noise_map, plate_bias(plates, self._seeds["plates"]))
+        temperature = generate_temperature(self.latitude_span, elevation, rows % self.latitude_span)
+        base_moisture = generate_moisture(None, elevation, temperature, noise_cache=self.noise_cache, rows=rows,
+                                          cols=cols, noise_seed=self._seeds["noise"])
+        grid = classify_biomes(elevation, base_moisture, temperature)
+
+        # Rivers from hashed sources; flow directions are exact one tile inside the window.
+        water = grid.mask("Ocean", "Coast")
+        sources = ((elevation > self.min_elev_start) & ~water
+                   & (lattice_uniform(self._seeds["rivers"], rows[:, None], cols[None, :]) < self.river_density))
+        targets = flow_targets(compute_flow_directions(elevation))
+        rivers = trace_river_network(np.flatnonzero(sources), targets, water | (elevation < SEA_LEVEL),
+                                     self.max_river_length)
+        # The direct convolution sums taps in a fixed order per tile, so seams match bit for bit.
+        moisture = np.clip(base_moisture + river_moisture_boost(rivers, method="direct"), 0, 1)
+
+        k = self.resource_iterations
+        resource_window = (slice(margin - k, margin + size + k), slice(margin - k, margin + size + k))
+        resources = generate_resource_grid(grid.ids[resource_window], k,
+                                           TileRandom(self._seeds["resources"], row0 + margin - k,
+                                                      col0 + margin - k))[k:k + size, k:k + size]
+
+        ids = grid.ids[inner]
+        layers = {
+            "elevation": elevation[inner],
+            "temperature": temperature[inner],
+            "moisture": moisture[inner],
+            "rivers": rivers[inner],
+            "resources": resources,
+            "biome_ids": ids,
+            "biome_temperature": grid.temperature[inner],
+            "biome_humidity": grid.humidity[inner],
+            "biome_fertility": grid.fertility[inner],
+            "biome_elevation": grid.elevation[inner],
+            "biome_livestock": sample_livestock(ids, TileRandom(self._seeds["livestock"], ci * size, cj * size)),
+            "biome_special_features": sample_special_features(
+                ids, TileRandom(self._seeds["features"], ci * size, cj * size)),
+        }
+        return {name: np.ascontiguousarray(layers[name]) for name in CHUNK_LAYERS}
@@ -1,9 +1,110 @@
 # terrain.py
+import heapq
+import math
+from collections import OrderedDict, deque
+from functools import lru_cache
+
 import numpy as np
-import noise
 
-def generate_plates(map_size, same_plate_prob=0.95, new_plate_prob=0.05):
-    """Generates a plate map using a simple transition probability model."""
+from .perlin import fractal_noise, perlin_octave, lattice_uniform
+
+try:
+    import noise
+except ImportError:  # Only needed for the "noise" reference backend.
+    noise = None
+
+NOISE_BACKENDS = ("numpy", "noise")
+# Tiles below this elevation are open water (the same threshold the Ocean biome uses).
+SEA_LEVEL = -0.05
+PLATE_ENGINES = ("voronoi", "scan")
+# Voronoi plate ids are bucket_i * PLATE_ID_STRIDE + bucket_j of the plate centre.
+PLATE_ID_STRIDE = 2**32
+
+# Radius (in tiles) a river tile moistens.
+RIVER_INFLUENCE_RADIUS = 5
+# Largest river influence radius convolved directly; larger kernels go through the FFT.
+DIRECT_CONVOLUTION_RADIUS = 3
+
+# (frequency, octaves, weight) for each layer summed into the elevation noise map.
+NOISE_LAYERS = ((0.01, 2, 0.4), (0.05, 3, 0.3), (0.1, 4, 0.3))
+# (frequency, octaves, weight) of the noise added on top of the base moisture.
+MOISTURE_NOISE = (0.1, 2, 0.3)
+
+class NoiseCache:
+    """
+    Bounded LRU cache of single-octave noise fields shared by every terrain layer.
+
+    Fields are keyed by (frequency, octave, seed, grid extent), expressed as the octave's
+    effective frequency and repeat period so the key is independent of how a layer was
+    parameterised. Layers sampling the same lattice (e.g. the 0.1 elevation layer and the
+    moisture noise) reuse each other's octaves instead of resampling them.
+
+    Parameters:
+        max_bytes (int): Memory budget for cached fields. Least recently used fields
+            are evicted once it is exceeded; fields larger than the budget are not kept.
+    """
+
+    def __init__(self, max_bytes=512 * 2**20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._fields = OrderedDict()
+
+    @staticmethod
+    def _extent(coords):
+        """Compact key for a 1D coordinate array (start, length, step when evenly spaced)."""
+        if len(coords) > 1:
+            steps = np.diff(coords)
+            if np.all(steps == steps[0]):
+                return (coords[0].item(), len(coords), steps[0].item())
+            return coords.tobytes()
+        return tuple(coords.tolist())
+
+    def octave(self, rows, cols, frequency, octave=0, lacunarity=2.0, repeat=1024.0, seed=None):
+        """Returns one octave of Perlin noise over rows x cols, sampling it only on a miss."""
+        rows, cols = np.asarray(rows), np.asarray(cols)
+        scale = lacunarity ** octave
+        key = (frequency * scale, repeat * scale, seed, self._extent(rows), self._extent(cols))
+
+        field = self._fields.get(key)
+        if field is not None:
+            self.hits += 1
+            self._fields.move_to_end(key)
+            return field
+
+        self.misses += 1
+        field = perlin_octave(rows, cols, frequency * scale, repeat * scale, seed)
+        field.flags.writeable = False
+        if field.nbytes <= self.max_bytes:
+            self._fields[key] = field
+            self.nbytes += field.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._fields.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return field
+
+    def fractal(self, rows, cols, frequency, octaves=1, persistence=0.5, lacunarity=2.0,
+                repeat=1024.0, seed=None):
+        """Same result as perlin.fractal_noise, built from cached octaves."""
+        if octaves < 1:
+            raise ValueError("Expected octaves value > 0")
+        total = np.zeros((len(rows), len(cols)))
+        amp = 1.0
+        max_amp = 0.0
+        for octave in range(octaves):
+            total += self.octave(rows, cols, frequency, octave, lacunarity, repeat, seed) * amp
+            max_amp += amp
+            amp *= persistence
+        return total / max_amp
+
+    def clear(self):
+        self._fields.clear()
+        self.nbytes = 0
+
+def generate_plates(map_size, same_plate_prob=0.95, new_plate_prob=0.05, rng=None):
+    """Generates a plate map using a simple transition probability model (draws from rng)."""
+    rng = np.random.default_rng(rng)
     plates = np.zeros((map_size, map_size), dtype=int)
     plate_id = 1
     plates[0, 0] = plate_id
@@ -17,78 +118,300 @@ def generate_plates(map_size, same_plate_prob=0.95, new_plate_prob=0.05):
                 neighbors.append(plates[i-1, j])
             if j > 0:
                 neighbors.append(plates[i, j-1])
-            if neighbors and np.random.rand() < same_plate_prob:
-                plates[i, j] = np.random.choice(neighbors)
-            elif np.random.rand() < new_plate_prob:
+            if neighbors and rng.random() < same_plate_prob:
+                plates[i, j] = rng.choice(neighbors)
+            elif rng.random() < new_plate_prob:
                 plate_id += 1
                 plates[i, j] = plate_id
             else:
-                plates[i, j] = np.random.choice(neighbors) if neighbors else plate_id
+                plates[i, j] = rng.choice(neighbors) if neighbors else plate_id
     return plates
 
-def generate_noise_map(map_size):
+def _window(map_size, rows, cols):
+    """Defaults a rows/cols window to the whole map."""
+    rows = np.arange(map_size) if rows is None else np.asarray(rows)
+    cols = np.arange(map_size) if cols is None else np.asarray(cols)
+    return rows, cols
+
+def generate_plates_voronoi(map_size, plate_size=20, warp=0.35, size_variance=0.8, seed=None,
+                            rows=None, cols=None):
+    """
+    Generates a plate map from jittered Voronoi cells with noise-warped boundaries.
+
+    One plate centre is placed at a random point inside every plate_size x plate_size
+    bucket, which matches the density of generate_plates (a new plate every ~400 tiles
+    with the default probabilities). Each tile is displaced by Perlin noise and then
+    joins the closest centre among the 3x3 surrounding buckets, where every centre's
+    distance is reduced by a random weight so plate areas vary like the scan engine's
+    mix of large and small plates. Tiles are independent of each other, so the whole
+    map is labelled with a few array operations, and any window of the map (rows/cols)
+    can be labelled on its own and still agree with its neighbours.
+
+    Parameters:
+        map_size (int): The size of the map (assuming square).
+        plate_size (int): Side length of the bucket holding one plate centre.
+        warp (float): Boundary displacement as a fraction of plate_size.
+        size_variance (float): Maximum distance weight of a centre, as a fraction of plate_size.
+        seed (int or None): Seed for centres and warp noise; drawn from np.random if None.
+        rows (array-like): Tile rows to label; defaults to the whole map.
+        cols (array-like): Tile columns to label; defaults to the whole map.
+
+    Returns:
+        np.array: 2D int64 array of plate ids. Ids encode the bucket holding the plate
+            centre, so the same plate has the same id in every window.
+    """
+    if seed is None:
+        seed = np.random.randint(2**31)
+    rows, cols = _window(map_size, rows, cols)
+    shape = (rows.size, cols.size)
+    frequency = 1.0 / plate_size
+    offset = warp * plate_size
+    pos_i = rows[:, None] + fractal_noise(rows, cols, frequency, 2, seed=seed) * offset
+    pos_j = cols[None, :] + fractal_noise(rows, cols, frequency, 2, seed=seed + 1) * offset
+
+    bucket_i = np.floor(pos_i / plate_size).astype(np.int64)
+    bucket_j = np.floor(pos_j / plate_size).astype(np.int64)
+
+    # Centre jitter only has to be hashed once per bucket in range.
+    lo_i, lo_j = bucket_i.min() - 1, bucket_j.min() - 1
+    span_i = np.arange(lo_i, bucket_i.max() + 2)[:, None]
+    span_j = np.arange(lo_j, bucket_j.max() + 2)[None, :]
+    jitter_i = lattice_uniform(seed, span_i, span_j, 0)
+    jitter_j = lattice_uniform(seed, span_i, span_j, 1)
+    weight = lattice_uniform(seed, span_i, span_j, 2) * size_variance * plate_size
+
+    best_dist = np.full(shape, np.inf)
+    best_i = np.zeros(shape, dtype=np.int64)
+    best_j = np.zeros(shape, dtype=np.int64)
+    for di in (-1, 0, 1):
+        for dj in (-1, 0, 1):
+            cand_i = bucket_i + di
+            cand_j = bucket_j + dj
+            index = (cand_i - lo_i, cand_j - lo_j)
+            centre_i = (cand_i + jitter_i[index]) * plate_size
+            centre_j = (cand_j + jitter_j[index]) * plate_size
+            dist = np.hypot(pos_i - centre_i, pos_j - centre_j) - weight[index]
+            closer = dist < best_dist
+            best_dist[closer] = dist[closer]
+            best_i[closer] = cand_i[closer]
+            best_j[closer] = cand_j[closer]
+
+    return best_i * PLATE_ID_STRIDE + best_j
+
+def plate_bias(plates, seed):
+    """Per-tile base height of a plate map in [0.3, 1], hashed from the plate id."""
+    return 0.3 + 0.7 * lattice_uniform(seed, plates, 3)
+
+def sample_noise(map_size, frequency, octaves, backend="numpy", cache=None, rows=None, cols=None, seed=None):
+    """
+    Samples fractal Perlin noise at (i * frequency, j * frequency) for every tile in the window.
+
+    seed selects a shuffled permutation table (numpy backend only; the reference
+    backend always samples Ken Perlin's table).
+    """
+    rows, cols = _window(map_size, rows, cols)
+    if backend == "numpy":
+        if cache is not None:
+            return cache.fractal(rows, cols, frequency, octaves, seed=seed)
+        return fractal_noise(rows, cols, frequency, octaves, seed=seed)
+    if backend == "noise":
+        if noise is None:
+            raise ImportError("The 'noise' backend requires the noise package.")
+        noise_map = np.zeros((rows.size, cols.size))
+        for r, i in enumerate(rows):
+            for c, j in enumerate(cols):
+                noise_map[r, c] = noise.pnoise2(i * frequency, j * frequency, octaves=octaves)
+        return noise_map
+    raise ValueError(f"Unknown noise backend '{backend}', expected one of {NOISE_BACKENDS}.")
+
+def generate_noise_map(map_size, backend="numpy", cache=None, layers=NOISE_LAYERS, rows=None, cols=None,
+                       seed=None):
     """Generates a noise map using multiple layers of Perlin noise."""
-    noise_map = np.zeros((map_size, map_size))
-    for i in range(map_size):
-        for j in range(map_size):
-            low_freq = noise.pnoise2(i * 0.01, j * 0.01, octaves=2) * 0.4
-            med_freq = noise.pnoise2(i * 0.05, j * 0.05, octaves=3) * 0.3
-            high_freq = noise.pnoise2(i * 0.1, j * 0.1, octaves=4) * 0.3
-            noise_map[i, j] = low_freq + med_freq + high_freq
+    rows, cols = _window(map_size, rows, cols)
+    noise_map = np.zeros((rows.size, cols.size))
+    for frequency, octaves, weight in layers:
+        noise_map += sample_noise(map_size, frequency, octaves, backend, cache, rows, cols, seed) * weight
     return noise_map
 
-def combine_plates_and_noise(plates, noise_map):
-    """Combines the plate biases with the noise map to generate the final elevation."""
-    map_size = noise_map.shape[0]
-    unique_plates = np.unique(plates)
-    plate_elevation = {plate: np.random.uniform(0.3, 1) for plate in unique_plates}
-    elevation_map = np.zeros((map_size, map_size))
-    for i in range(map_size):
-        for j in range(map_size):
-            base_elev = plate_elevation[plates[i, j]] * 0.3
-            elev = (base_elev + noise_map[i, j] + 0.3) * 2 - 1
-            elevation_map[i, j] = np.tanh(elev * 2)
-    return elevation_map
+def combine_plates_and_noise(plates, noise_map, plate_elevation=None):
+    """
+    Combines the plate biases with the noise map to generate the final elevation.
+
+    plate_elevation gives every tile's plate bias in [0.3, 1]; if omitted, each plate
+    draws one from np.random.
+    """
+    if plate_elevation is None:
+        unique_plates, plate_index = np.unique(plates, return_inverse=True)
+        plate_elevation = np.random.uniform(0.3, 1, len(unique_plates))[plate_index].reshape(plates.shape)
+    base_elev = plate_elevation * 0.3
+    elev = (base_elev + noise_map + 0.3) * 2 - 1
+    return np.tanh(elev * 2)
+
+def generate_plate_map(map_size, plate_engine="voronoi", plate_seed=None, rows=None, cols=None):
+    """Plate ids from the chosen engine; only the Voronoi engine supports windows (rows/cols)."""
+    if plate_engine == "voronoi":
+        return generate_plates_voronoi(map_size, seed=plate_seed, rows=rows, cols=cols)
+    if plate_engine == "scan":
+        if rows is not None or cols is not None:
+            raise ValueError("The scan plate engine cannot generate a window of the map.")
+        return generate_plates(map_size, rng=plate_seed)
+    raise ValueError(f"Unknown plate engine '{plate_engine}', expected one of {PLATE_ENGINES}.")
 
-def generate_elevation(map_size):
-    """Generates the elevation map by combining plate generation and noise."""
-    plates = generate_plates(map_size)
-    noise_map = generate_noise_map(map_size)
-    elevation_map = combine_plates_and_noise(plates, noise_map)
+def generate_elevation(map_size, noise_backend="numpy", noise_cache=None, plate_engine="voronoi",
+                       plate_seed=None, rows=None, cols=None, noise_seed=None):
+    """
+    Generates the elevation map by combining plate generation and noise.
+
+    plate_seed (drawn from np.random if None) seeds the plates and their heights.
+    With the Voronoi engine every tile only depends on its coordinates and plate_seed,
+    so a window (rows/cols) of the map can be generated on its own; the scan engine
+    labels the map sequentially and only supports the whole map. noise_seed seeds the
+    noise permutation (see sample_noise).
+    """
+    if plate_seed is None:
+        plate_seed = np.random.randint(2**31)
+    plates = generate_plate_map(map_size, plate_engine, plate_seed, rows, cols)
+    noise_map = generate_noise_map(map_size, noise_backend, noise_cache, rows=rows, cols=cols, seed=noise_seed)
+    elevation_map = combine_plates_and_noise(plates, noise_map, plate_bias(plates, plate_seed))
     return elevation_map
 
-def generate_temperature(map_size, elevation_map):
-    """Generates a temperature map (warmer at the center, cooler at the edges, adjusted by elevation)."""
-    temperature_map = np.zeros((map_size, map_size))
-    for y in range(map_size):
-        temperature_map[y, :] = 1 - abs((y - map_size // 2) / (map_size // 2))
-    for i in range(map_size):
-        for j in range(map_size):
-            temperature_map[i, j] -= max(0, elevation_map[i, j]) * 0.3
+def generate_temperature(map_size, elevation_map, rows=None):
+    """
+    Generates a temperature map (warmer at the center, cooler at the edges, adjusted by elevation).
+
+    rows gives the map rows elevation_map covers when it is a window of the map.
+    """
+    rows = np.arange(map_size) if rows is None else np.asarray(rows)
+    latitude = 1 - np.abs((rows - map_size // 2) / (map_size // 2))
+    temperature_map = latitude[:, None] - np.maximum(0, elevation_map) * 0.3
     return np.clip(temperature_map, 0, 1)
 
-def generate_moisture(map_size, elevation_map, temperature_map):
+def generate_moisture(map_size, elevation_map, temperature_map, noise_backend="numpy", noise_cache=None,
+                      rows=None, cols=None, noise_seed=None):
     """Generates a base moisture map based on temperature and elevation."""
-    moisture_map = np.zeros((map_size, map_size))
-    for i in range(map_size):
-        for j in range(map_size):
-            base_moist = temperature_map[i, j] * np.exp(-max(0, elevation_map[i, j]))
-            moist_noise = noise.pnoise2(i * 0.1, j * 0.1, octaves=2) * 0.3
-            moisture_map[i, j] = base_moist + moist_noise
-    return np.clip(moisture_map, 0, 1)
+    frequency, octaves, weight = MOISTURE_NOISE
+    base_moist = temperature_map * np.exp(-np.maximum(0, elevation_map))
+    moist_noise = sample_noise(map_size, frequency, octaves, noise_backend, noise_cache, rows, cols,
+                               noise_seed) * weight
+    return np.clip(base_moist + moist_noise, 0, 1)
+
+@lru_cache(maxsize=16)
+def river_moisture_kernel(influence_radius, moisture_boost):
+    """Radial moisture kernel: moisture_boost * (1 - distance / influence_radius) inside the radius."""
+    offsets = np.arange(-influence_radius, influence_radius + 1)
+    distance = np.sqrt(offsets[:, None] ** 2 + offsets[None, :] ** 2)
+    kernel = np.where(distance <= influence_radius, moisture_boost * (1 - distance / influence_radius), 0.0)
+    kernel.flags.writeable = False
+    return kernel
 
-def adjust_moisture_for_rivers(moisture_map, river_map, influence_radius=5, moisture_boost=0.1):
+def river_moisture_boost(river_map, influence_radius=RIVER_INFLUENCE_RADIUS, moisture_boost=0.1, method="auto"):
+    """
+    Computes the moisture added around rivers as one 2D convolution of the river map.
+
+    Parameters:
+        river_map (np.array): 2D boolean array indicating river locations.
+        influence_radius (int): Radius (in tiles) a river tile moistens.
+        moisture_boost (float): Moisture added directly next to a river.
+        method (str): "direct" sums shifted copies of the river map per kernel tap,
+            "fft" multiplies in the frequency domain, "auto" picks by radius.
+
+    Returns:
+        np.array: 2D float array with the same shape as river_map.
+    """
+    kernel = river_moisture_kernel(influence_radius, moisture_boost)
+    rivers = np.asarray(river_map, dtype=float)
+    rows, cols = rivers.shape
+    r = influence_radius
+    if method == "auto":
+        method = "direct" if r <= DIRECT_CONVOLUTION_RADIUS else "fft"
+
+    if method == "direct":
+        padded = np.zeros((rows + 2 * r, cols + 2 * r))
+        for di, dj in zip(*np.nonzero(kernel)):
+            padded[2 * r - di:2 * r - di + rows, 2 * r - dj:2 * r - dj + cols] += kernel[di, dj] * rivers
+        return padded[r:r + rows, r:r + cols]
+    if method == "fft":
+        shape = (rows + 2 * r, cols + 2 * r)
+        spectrum = np.fft.rfft2(rivers, shape) * np.fft.rfft2(kernel, shape)
+        return np.fft.irfft2(spectrum, shape)[r:r + rows, r:r + cols]
+    raise ValueError(f"Unknown convolution method '{method}', expected 'auto', 'direct' or 'fft'.")
+
+def adjust_moisture_for_rivers(moisture_map, river_map, influence_radius=RIVER_INFLUENCE_RADIUS, moisture_boost=0.1):
     """Adjusts moisture map to increase moisture near rivers."""
-    map_size = moisture_map.shape[0]
-    for i in range(map_size):
-        for j in range(map_size):
-            if river_map[i, j]:
-                for di in range(-influence_radius, influence_radius + 1):
-                    for dj in range(-influence_radius, influence_radius + 1):
-                        ni, nj = i + di, j + dj
-                        if 0 <= ni < map_size and 0 <= nj < map_size:
-                            distance = np.sqrt(di**2 + dj**2)
-                            if distance <= influence_radius:
-                                moisture_increase = moisture_boost * (1 - distance / influence_radius)
-                                moisture_map[ni, nj] += moisture_increase
-    return np.clip(moisture_map, 0, 1)
\ No newline at end of file
+    boost = river_moisture_boost(river_map, influence_radius, moisture_boost)
+    return np.clip(moisture_map + boost, 0, 1)
+
+def fill_depressions(elevation_map, outlet_mask=None, out=None):
+    """
+    Fills every closed depression so that all land drains to an outlet (Priority-Flood+ε).
+
+    Starting from the outlets (the map border and open water), tiles are flooded in
+    order of elevation with a heap. A tile lower than the tile it was reached from is
+    raised to just above it (math.nextafter), so every filled tile keeps a strictly
+    lower neighbour and steepest descent always ends at an outlet. Raised tiles go on a
+    FIFO pit queue that is drained before the heap (Barnes et al.), so a depression or
+    flat is filled in one batch without heap operations. The working copy stays a
+    NumPy float64 buffer and only (elevation, index) pairs of unprocessed tiles go on
+    the heap. Runs in O(N log N).
+
+    Parameters:
+        elevation_map (np.array): 2D elevation array.
+        outlet_mask (np.array): 2D boolean array of tiles water can leave the map through;
+            defaults to tiles below SEA_LEVEL.
+        out (np.array or None): C-contiguous 2D float64 array (e.g. a memmap) to fill in
+            place of a new copy; besides it the pass needs a byte per tile and the heap.
+
+    Returns:
+        np.array: Filled copy of elevation_map (never lower than the input).
+    """
+    rows, cols = elevation_map.shape
+    if outlet_mask is None:
+        outlet_mask = elevation_map < SEA_LEVEL
+
+    border = np.zeros((rows, cols), dtype=bool)
+    border[[0, -1], :] = True
+    border[:, [0, -1]] = True
+    # Only outlets touching land need to be on the heap; the rest are simply closed.
+    land = ~outlet_mask
+    padded_land = np.pad(land, 1)
+    touches_land = np.zeros((rows, cols), dtype=bool)
+    for di in (-1, 0, 1):
+        for dj in (-1, 0, 1):
+            touches_land |= padded_land[1 + di:1 + di + rows, 1 + dj:1 + dj + cols]
+    seeds = np.flatnonzero((outlet_mask & touches_land) | (border & land))
+
+    if out is None:
+        out = np.empty((rows, cols), dtype=np.float64)
+    out[:] = elevation_map
+    filled_array = out.reshape(-1)
+    closed_array = outlet_mask.ravel().astype(np.uint8)
+    closed_array[seeds] = 1
+    # Memoryviews give Python-speed scalar access to the NumPy buffers.
+    filled = memoryview(filled_array)
+    closed = memoryview(closed_array)
+    heap = list(zip(filled_array[seeds].tolist(), seeds.tolist()))
+    heapq.heapify(heap)
+    pit = deque()
+
+    offsets = [(di, dj) for di in (-1, 0, 1) for dj in (-1, 0, 1) if di or dj]
+    while heap or pit:
+        if pit:
+            k = pit.popleft()
+            z = filled[k]
+        else:
+            z, k = heapq.heappop(heap)
+        i, j = divmod(k, cols)
+        for di, dj in offsets:
+            ni, nj = i + di, j + dj
+            if 0 <= ni < rows and 0 <= nj < cols:
+                n = ni * cols + nj
+                if closed[n]:
+                    continue
+                closed[n] = 1
+                if filled[n] <= z:
+                    filled[n] = math.nextafter(z, math.inf)
+                    pit.append(n)
+                else:
+                    heapq.heappush(heap, (filled[n], n))
+
+    return out